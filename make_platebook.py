@@ -5,9 +5,9 @@ Usage: python3 make_platebook.py
 """
 
 import sys
-import json
 import os
-from platebook import generate
+from platebook import parse_csv_text
+from platebook_cache import generate_cached
 
 def main():
     print("=" * 50)
@@ -33,10 +33,8 @@ def main():
         # Fetch CSV
         print("\n📥 Fetching data from Google Sheets...")
         try:
-            import requests
-            response = requests.get(data_source, timeout=10)
-            response.raise_for_status()
-            csv_text = response.text
+            import platebook_fetch
+            csv_text = platebook_fetch.fetch_text(data_source)
         except Exception as e:
             print(f"❌ Error fetching sheet: {e}")
             sys.exit(1)
@@ -56,19 +54,11 @@ def main():
     
     # Parse CSV to lessons
     print("📋 Parsing lessons...")
-    lessons = []
-    lines = csv_text.strip().split('\n')
-    
-    for line in lines[1:]:  # Skip header
-        if not line.strip():
-            continue
-        parts = line.split(',')
-        if len(parts) >= 3:
-            lessons.append({
-                "plate_number": int(parts[0].strip()),
-                "title": parts[1].strip().replace('"', ''),
-                "date": parts[2].strip().replace('"', '')
-            })
+    try:
+        lessons = list(parse_csv_text(csv_text))
+    except ValueError as e:
+        print(f"❌ Could not parse CSV: {e}")
+        sys.exit(1)
     
     if not lessons:
         print("❌ No lessons found")
@@ -90,22 +80,19 @@ def main():
     if not output:
         output = "platebook.pdf"
     
-    # Create JSON for generate function
+    # Create data for the generator
     data = {
         "course": course,
         "term": term,
         "lessons": lessons
     }
     
-    # Save temp JSON
-    temp_json = ".temp_lessons.json"
-    with open(temp_json, 'w') as f:
-        json.dump(data, f, indent=2)
-    
     # Generate PDF
     print(f"\n🎨 Generating {output}...")
     try:
-        generate(temp_json, output)
+        pdf_bytes = generate_cached(data)
+        with open(output, 'wb') as f:
+            f.write(pdf_bytes)
         print(f"\n✅ SUCCESS! Created: {output}")
         print(f"📄 Location: {os.path.abspath(output)}")
     except Exception as e:
@@ -113,10 +100,6 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
-    finally:
-        # Clean up temp file
-        if os.path.exists(temp_json):
-            os.remove(temp_json)
 
 if __name__ == "__main__":
     main()
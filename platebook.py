@@ -7,14 +7,28 @@ Layout is reverse-engineered from HIST213_Platebook_Winter2026.pdf
 and MUST NOT be changed without re-measuring the PDF.
 
 Usage:
-    python platebook.py lessons.json output.pdf
+    python platebook.py lessons.json output.pdf [--profile]
+    python platebook.py lessons.jsonl output.pdf --course "..." --term "..."
 """
 
+import argparse
+import csv
+import hashlib
+import io
 import json
-import sys
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from PIL import Image
 from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
 from reportlab.lib.colors import Color, black
+from reportlab.lib.utils import ImageReader
 
 # =============================================================================
 # PAGE + DESIGN CONSTANTS  (DO NOT CHANGE)
@@ -22,6 +36,9 @@ from reportlab.lib.colors import Color, black
 
 PAGE_WIDTH, PAGE_HEIGHT = letter
 
+# Bump whenever the rendered output changes, so cached PDFs are invalidated
+LAYOUT_VERSION = 2
+
 LEFT_MARGIN = 36
 RIGHT_MARGIN = 576
 TOP_MARGIN = 29
@@ -116,6 +133,26 @@ BOTTOM_LEFT_WIDTH = 264
 BOTTOM_RIGHT_WIDTH = 264
 BOTTOM_RIGHT_X = 312
 
+# -----------------------------------------------------------------------------
+# Cover image
+# -----------------------------------------------------------------------------
+
+COVER_IMG_WIDTH = 500
+COVER_IMG_HEIGHT = 400
+COVER_DPI = 200  # Resolution the cover is downsampled to inside its box
+COVER_JPEG_QUALITY = 85
+COVER_CACHE_SIZE = 16  # Processed covers kept in memory
+
+# -----------------------------------------------------------------------------
+# Table of contents
+# -----------------------------------------------------------------------------
+
+TOC_FIRST_Y = PAGE_HEIGHT - 95  # First entry on the first TOC page
+TOC_CONTINUED_Y = PAGE_HEIGHT - 60  # First entry on overflow pages
+TOC_MIN_Y = 100  # Start a new page below this
+TOC_LINE_HEIGHT = 22
+TOC_FIRST_PAGE_ENTRIES = int((TOC_FIRST_Y - TOC_MIN_Y) // TOC_LINE_HEIGHT) + 1
+
 # =============================================================================
 # DRAWING HELPERS
 # =============================================================================
@@ -127,17 +164,22 @@ def draw_grid_background(c, x, top, w, h, grid_size=10):
     """Draw subtle grid pattern background"""
     y = _y(top, h)
 
-    # Draw grid lines
+    # Draw grid lines as a single path (one stroke per box)
     c.setStrokeColor(GRID_GRAY)
     c.setLineWidth(0.3)
+    path = c.beginPath()
 
     # Vertical lines
     for i in range(0, int(w) + 1, grid_size):
-        c.line(x + i, y, x + i, y + h)
+        path.moveTo(x + i, y)
+        path.lineTo(x + i, y + h)
 
     # Horizontal lines
     for i in range(0, int(h) + 1, grid_size):
-        c.line(x, y + i, x + w, y + i)
+        path.moveTo(x, y + i)
+        path.lineTo(x + w, y + i)
+
+    c.drawPath(path, stroke=1, fill=0)
 
 def draw_square(c, x, top, w, h, fill=False, gray=False):
     """Draw square-cornered box for content areas"""
@@ -182,9 +224,12 @@ def draw_lined_box(c, x, top, w, h, line_spacing=12):
     c.setStrokeColor(Color(0.75, 0.75, 0.75))  # Darker gray for writing lines
     c.setLineWidth(0.5)
     num_lines = int(h / line_spacing)
+    path = c.beginPath()
     for i in range(1, num_lines):
         line_y = y + (i * line_spacing)
-        c.line(x, line_y, x + w, line_y)
+        path.moveTo(x, line_y)
+        path.lineTo(x + w, line_y)
+    c.drawPath(path, stroke=1, fill=0)
 
     # Reset stroke color
     c.setStrokeColor(BLACK)
@@ -214,35 +259,76 @@ def draw_round(c, x, top, w, h, fill=False, gray=False, grid=False, radius=None)
         c.roundRect(x, y, w, h, radius, stroke=1, fill=0)
 
 
+@lru_cache(maxsize=8192)
+def _unit_width(text, font):
+    """Width of text at 1pt; widths scale linearly with font size."""
+    return stringWidth(text, font, 1000) / 1000
+
+def text_width(text, font, size):
+    """Memoized equivalent of c.stringWidth(text, font, size)"""
+    return _unit_width(text, font) * size
+
+def fit_font_size(text, font, size, available_width, min_size=6, step=0.5):
+    """Largest of size, size - step, ... that fits, but never below min_size.
+
+    Same result as shrinking by step until the text fits, computed in
+    closed form instead of one stringWidth call per step.
+    """
+    unit = _unit_width(text, font)
+    if unit * size <= available_width:
+        return size
+
+    max_steps = math.ceil((size - min_size) / step)
+    if not unit:  # Empty text in a box narrower than the padding
+        return size - max_steps * step
+    steps = min(max_steps, math.ceil((size - available_width / unit) / step))
+    # Guard against float rounding at the exact boundary
+    if steps < max_steps and unit * (size - steps * step) > available_width:
+        steps += 1
+    if steps > 1 and unit * (size - (steps - 1) * step) <= available_width:
+        steps -= 1
+    return size - steps * step
+
 def draw_centered(c, text, x, top, w, h, size=FONT_SIZE, bold=False):
     font = "Times-Bold" if bold else FONT_NAME
     
     # Auto-shrink logic
-    current_size = size
-    min_size = 6
-    text_width = c.stringWidth(text, font, current_size)
     available_width = w - 4 # 2px padding on each side
-    
-    while text_width > available_width and current_size > min_size:
-        current_size -= 0.5
-        text_width = c.stringWidth(text, font, current_size)
+    current_size = fit_font_size(text, font, size, available_width)
+    text_width_pts = text_width(text, font, current_size)
     
     c.setFont(font, current_size)
     c.setFillColor(BLACK)  # Ensure text is always black
     y = _y(top, h) + (h - current_size) / 2 + 2 # Recenter vertically based on new size
-    c.drawString(x + (w - text_width) / 2, y, text)
+    c.drawString(x + (w - text_width_pts) / 2, y, text)
 
 # =============================================================================
 # PLATE DRAWING (NO PAGINATION HERE)
 # =============================================================================
 
-def draw_standard_plate(c, n, title, date):
+# Names of the form XObjects holding the static part of each plate type.
+STANDARD_SKELETON_FORM = "StandardPlateSkeleton"
+PRESENTATION_SKELETON_FORM = "PresentationPlateSkeleton"
+
+def draw_form(c, name, draw):
+    """Draw a static layer via a form XObject, recording it on first use.
+
+    The form is stored once in the PDF and referenced from every page,
+    so the grid/label operators are not repeated per plate.
+    """
+    if not c.hasForm(name):
+        c.beginForm(name)
+        draw(c)
+        c.endForm()
+    c.doForm(name)
+
+def draw_plate_header(c, n, title, date):
     # Header - less rounded corners, bigger text
     draw_round(c, PLATE_NUM_X, HEADER_Y, PLATE_NUM_WIDTH, HEADER_HEIGHT, radius=HEADER_CORNER_RADIUS)
     draw_centered(c, f"Plate # {n}", PLATE_NUM_X, HEADER_Y, PLATE_NUM_WIDTH, HEADER_HEIGHT, size=14, bold=True)
 
     # Calculate dynamic date box width
-    date_text_width = c.stringWidth(date, "Times-Bold", 14)
+    date_text_width = text_width(date, "Times-Bold", 14)
     date_box_width = date_text_width + 20  # Add padding
     date_box_x = RIGHT_MARGIN - date_box_width
 
@@ -254,6 +340,8 @@ def draw_standard_plate(c, n, title, date):
     draw_round(c, date_box_x, HEADER_Y, date_box_width, HEADER_HEIGHT, radius=HEADER_CORNER_RADIUS)
     draw_centered(c, date, date_box_x, HEADER_Y, date_box_width, HEADER_HEIGHT, size=14, bold=True)
 
+def draw_standard_skeleton(c):
+    """Everything on a standard plate except the header (number, title, date)."""
     # Person / Place / Thing labels - 10pt bold to fit
     draw_round(c, PERSON_LABEL_X, PPT_LABEL_Y, PERSON_LABEL_WIDTH, PPT_LABEL_HEIGHT)
     draw_centered(c, "Person", PERSON_LABEL_X, PPT_LABEL_Y, PERSON_LABEL_WIDTH, PPT_LABEL_HEIGHT, size=10, bold=True)
@@ -278,11 +366,15 @@ def draw_standard_plate(c, n, title, date):
     draw_round(c, LEFT_MARGIN, TIMELINE_BOX_Y, TIMELINE_BOX_WIDTH, TIMELINE_BOX_HEIGHT, grid=True)
 
     y = PAGE_HEIGHT - TIMELINE_LINE_Y
-    c.line(TICK_START_X, y, TICK_END_X, y)
+    path = c.beginPath()
+    path.moveTo(TICK_START_X, y)
+    path.lineTo(TICK_END_X, y)
     step = (TICK_END_X - TICK_START_X) / TICK_COUNT
     for i in range(TICK_COUNT + 1):
         x = TICK_START_X + i * step
-        c.line(x, y - 8, x, y + 8)
+        path.moveTo(x, y - 8)
+        path.lineTo(x, y + 8)
+    c.drawPath(path, stroke=1, fill=0)
 
     # Map - 10pt bold to fit
     draw_round(c, LEFT_MARGIN, MAP_LABEL_Y, MAP_LABEL_WIDTH, MAP_LABEL_HEIGHT)
@@ -318,47 +410,141 @@ def draw_standard_plate(c, n, title, date):
     draw_grid_box(c, LEFT_MARGIN, BOTTOM_BOX_Y, BOTTOM_LEFT_WIDTH, BOTTOM_BOX_HEIGHT)  # Grid only, no lines
     draw_lined_box(c, BOTTOM_RIGHT_X, BOTTOM_BOX_Y, BOTTOM_RIGHT_WIDTH, BOTTOM_BOX_HEIGHT, line_spacing=10)
 
-def draw_presentation_plate(c, n, date):
-    draw_round(c, PLATE_NUM_X, HEADER_Y, PLATE_NUM_WIDTH, HEADER_HEIGHT, radius=HEADER_CORNER_RADIUS)
-    draw_centered(c, f"Plate # {n}", PLATE_NUM_X, HEADER_Y, PLATE_NUM_WIDTH, HEADER_HEIGHT, size=14, bold=True)
-
-    # Calculate dynamic date box width
-    date_text_width = c.stringWidth(date, "Times-Bold", 14)
-    date_box_width = date_text_width + 20  # Add padding
-    date_box_x = RIGHT_MARGIN - date_box_width
-
-    # Title extends to just before date box
-    title_box_width = date_box_x - TITLE_X - 10
-    draw_round(c, TITLE_X, HEADER_Y, title_box_width, HEADER_HEIGHT, radius=HEADER_CORNER_RADIUS)
-    draw_centered(c, "Final presentations", TITLE_X, HEADER_Y, title_box_width, HEADER_HEIGHT, size=13, bold=True)
-
-    draw_round(c, date_box_x, HEADER_Y, date_box_width, HEADER_HEIGHT, radius=HEADER_CORNER_RADIUS)
-    draw_centered(c, date, date_box_x, HEADER_Y, date_box_width, HEADER_HEIGHT, size=14, bold=True)
-
+def draw_presentation_skeleton(c):
+    """Everything on a presentation plate except the header."""
     draw_round(c, LEFT_MARGIN, 78, 55, 24)
     draw_centered(c, "Notes", LEFT_MARGIN, 78, 55, 24, bold=True)
 
     draw_lined_box(c, LEFT_MARGIN, 102, 540, 618, line_spacing=14)
 
+def draw_standard_plate(c, n, title, date):
+    draw_plate_header(c, n, title, date)
+    draw_form(c, STANDARD_SKELETON_FORM, draw_standard_skeleton)
+
+def draw_presentation_plate(c, n, date):
+    draw_plate_header(c, n, "Final presentations", date)
+    draw_form(c, PRESENTATION_SKELETON_FORM, draw_presentation_skeleton)
+
 # =============================================================================
 # MAIN
 # =============================================================================
 
-def generate(lessons_file, output_pdf, cover_image_path=None):
-    with open(lessons_file) as f:
-        data = json.load(f)
+class RenderMetrics:
+    """Timings and counts collected while rendering one platebook.
+
+    Pass an instance as metrics= to generate()/generate_to_stream().
+    on_phase, if given, is called as on_phase(name, seconds) after each phase.
+    """
+
+    def __init__(self, on_phase=None):
+        self.on_phase = on_phase
+        self.phases = {}  # name -> seconds
+        self.plates = 0
+        self.presentation_plates = 0
+        self.pages = 0
+        # ReportLab content-stream fragments (about one per drawing call) on
+        # pages; not an operator count, and form XObject content is excluded
+        self.page_fragments = 0
+        self.output_bytes = 0
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if self.on_phase:
+                self.on_phase(name, elapsed)
+
+    def show_page(self, c):
+        self.page_fragments += len(c._code)
+        self.pages += 1
+        c.showPage()
 
-    c = canvas.Canvas(output_pdf, pagesize=letter)
+    def as_dict(self):
+        return {
+            "phases": dict(self.phases),
+            "plates": self.plates,
+            "presentation_plates": self.presentation_plates,
+            "pages": self.pages,
+            "page_fragments": self.page_fragments,
+            "output_bytes": self.output_bytes,
+        }
+
+    def report(self):
+        lines = [f"  {name:<10} {seconds * 1000:9.1f} ms" for name, seconds in self.phases.items()]
+        lines.append(f"  {'total':<10} {sum(self.phases.values()) * 1000:9.1f} ms")
+        lines.append(f"  {self.plates} plates ({self.presentation_plates} presentation), "
+                     f"{self.pages} pages, {self.page_fragments} content fragments, "
+                     f"{self.output_bytes} bytes")
+        return "\n".join(lines)
+
+def generate(lessons_file, output_pdf, cover_image_path=None, metrics=None):
+    if metrics is None:
+        metrics = RenderMetrics()
+    with metrics.phase("json_load"):
+        with open(lessons_file) as f:
+            data = json.load(f)
+
+    generate_to_stream(data, output_pdf, cover_image=cover_image_path, metrics=metrics)
+
+_cover_cache = OrderedDict()  # content hash -> processed image bytes
+_cover_cache_lock = threading.Lock()
+
+def prepare_cover_image(cover_image, dpi=COVER_DPI, quality=COVER_JPEG_QUALITY):
+    """Downsample and recompress a cover image for the cover box.
+
+    cover_image: image path or binary file-like object.
+    Returns a BytesIO with an image no larger than the cover box at dpi.
+    Opaque images become JPEG; images with transparency stay PNG.
+    Results are cached in memory by content hash.
+    """
+    if isinstance(cover_image, (str, os.PathLike)):
+        with open(cover_image, "rb") as f:
+            raw = f.read()
+    else:
+        raw = cover_image.read()
+
+    key = (hashlib.sha256(raw).hexdigest(), dpi, quality)
+    with _cover_cache_lock:
+        if key in _cover_cache:
+            _cover_cache.move_to_end(key)
+            return io.BytesIO(_cover_cache[key])
+
+    img = Image.open(io.BytesIO(raw))
+    max_size = (math.ceil(COVER_IMG_WIDTH * dpi / 72), math.ceil(COVER_IMG_HEIGHT * dpi / 72))
+    img.thumbnail(max_size, Image.LANCZOS)  # Only ever shrinks; keeps aspect ratio
+
+    out = io.BytesIO()
+    has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+    if has_alpha:
+        img.save(out, "PNG", optimize=True)
+    else:
+        img.convert("RGB").save(out, "JPEG", quality=quality, optimize=True)
+    processed = out.getvalue()
+
+    with _cover_cache_lock:
+        _cover_cache[key] = processed
+        while len(_cover_cache) > COVER_CACHE_SIZE:
+            _cover_cache.popitem(last=False)
+    return io.BytesIO(processed)
 
+def draw_cover_page(c, course, term, cover_image=None, cover_dpi=COVER_DPI):
     # Cover Page - title at bottom, large space for image at top
     # Draw image if provided
-    if cover_image_path:
+    if cover_image:
         try:
+            if cover_dpi:
+                cover_image = prepare_cover_image(cover_image, dpi=cover_dpi)
+            if not isinstance(cover_image, str):
+                cover_image = ImageReader(cover_image)
             # Draw image centered in the top space
             # Available space: approx y=250 to y=750
-            img_width = 500
-            img_height = 400
-            c.drawImage(cover_image_path, (PAGE_WIDTH - img_width)/2, 280, 
+            img_width = COVER_IMG_WIDTH
+            img_height = COVER_IMG_HEIGHT
+            c.drawImage(cover_image, (PAGE_WIDTH - img_width)/2, 280, 
                        width=img_width, height=img_height, 
                        preserveAspectRatio=True, anchor='c')
         except Exception as e:
@@ -366,19 +552,38 @@ def generate(lessons_file, output_pdf, cover_image_path=None):
 
     c.setFont("Times-Bold", 18)
     c.setFillColor(BLACK)
-    w = c.stringWidth(data["course"], "Times-Bold", 18)
-    c.drawString((PAGE_WIDTH - w) / 2, 180, data["course"])
+    w = c.stringWidth(course, "Times-Bold", 18)
+    c.drawString((PAGE_WIDTH - w) / 2, 180, course)
 
     c.setFont("Times-Bold", 16)
-    w = c.stringWidth(data["term"], "Times-Bold", 16)
-    c.drawString((PAGE_WIDTH - w) / 2, 150, data["term"])
+    w = c.stringWidth(term, "Times-Bold", 16)
+    c.drawString((PAGE_WIDTH - w) / 2, 150, term)
 
     c.setFont(FONT_NAME, 12)
     name = "Name:_____________________________________"
     w = c.stringWidth(name, FONT_NAME, 12)
     c.drawString((PAGE_WIDTH - w) / 2, 100, name)
 
-    c.showPage()
+def truncate_text(c, text, font, size, max_width):
+    """Longest prefix of text that fits with a trailing "...", found by binary search."""
+    if text_width(text, font, size) <= max_width:
+        return text
+    lo, hi = 0, len(text)  # Answer is the largest fitting prefix length in [lo, hi]
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if text_width(text[:mid] + "...", font, size) <= max_width:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "..."
+
+def draw_toc(c, lessons, show_page=None):
+    """Table of Contents - starts a new page itself when it overflows.
+
+    show_page, if given, is called instead of c.showPage() on overflow.
+    """
+    if show_page is None:
+        show_page = c.showPage
 
     # Table of Contents (Page 2) - Attractive design
     c.setFont("Times-Bold", 20)
@@ -392,24 +597,16 @@ def generate(lessons_file, output_pdf, cover_image_path=None):
     c.line(LEFT_MARGIN, PAGE_HEIGHT - 70, RIGHT_MARGIN, PAGE_HEIGHT - 70)
     c.setLineWidth(0.5)
     c.line(LEFT_MARGIN, PAGE_HEIGHT - 74, RIGHT_MARGIN, PAGE_HEIGHT - 74)
-    
-    # TOC Helper
-    def truncate_text(c, text, font, size, max_width):
-        if c.stringWidth(text, font, size) <= max_width:
-            return text
-        while c.stringWidth(text + "...", font, size) > max_width and len(text) > 0:
-            text = text[:-1]
-        return text + "..."
 
     c.setFont("Times-Bold", 11)
-    y_pos = PAGE_HEIGHT - 95
+    y_pos = TOC_FIRST_Y
     toc_left = 80  # More compact left margin
     toc_right = PAGE_WIDTH - 80  # More compact right margin
 
-    for lesson in data["lessons"]:
-        if y_pos < 100:  # Start new page if needed
-            c.showPage()
-            y_pos = PAGE_HEIGHT - 60
+    for lesson in lessons:
+        if y_pos < TOC_MIN_Y:  # Start new page if needed
+            show_page()
+            y_pos = TOC_CONTINUED_Y
 
         # Plate number in bold
         plate_text = f"Plate {lesson['plate_number']}"
@@ -417,7 +614,7 @@ def generate(lessons_file, output_pdf, cover_image_path=None):
 
         # Title in regular Times
         c.setFont(FONT_NAME, 11)
-        date_w = c.stringWidth(lesson['date'], FONT_NAME, 11)
+        date_w = text_width(lesson['date'], FONT_NAME, 11)
         max_title_w = (toc_right - date_w - 15) - (toc_left + 70)
 
         short_title = truncate_text(c, lesson['title'], FONT_NAME, 11, max_title_w)
@@ -434,25 +631,256 @@ def generate(lessons_file, output_pdf, cover_image_path=None):
         c.setStrokeColor(BLACK)
 
         c.setFont("Times-Bold", 11)  # Reset for next plate number
-        y_pos -= 22
+        y_pos -= TOC_LINE_HEIGHT
+
+def toc_page_count(num_lessons):
+    """Number of pages draw_toc() uses for num_lessons entries"""
+    first = TOC_FIRST_PAGE_ENTRIES
+    per_page = int((TOC_CONTINUED_Y - TOC_MIN_Y) // TOC_LINE_HEIGHT) + 1
+    if num_lessons <= first:
+        return 1
+    return 1 + math.ceil((num_lessons - first) / per_page)
+
+def draw_plate(c, lesson):
+    if lesson.get("presentation"):
+        draw_presentation_plate(c, lesson["plate_number"], lesson["date"])
+    else:
+        draw_standard_plate(c,
+                            lesson["plate_number"],
+                            lesson["title"],
+                            lesson["date"])
+
+def generate_to_stream(data, fileobj, cover_image=None, metrics=None, cover_dpi=COVER_DPI):
+    """Render a platebook from in-memory data.
+
+    data: dict with "course", "term" and "lessons" (any iterable of lesson dicts).
+    fileobj: writable binary file-like object (or an output filename).
+    cover_image: optional image path or binary file-like object.
+    metrics: optional RenderMetrics to fill in.
+    cover_dpi: resolution the cover is downsampled to (None embeds it as-is).
+    """
+    if metrics is None:
+        metrics = RenderMetrics()
+    lessons = list(data["lessons"])  # Iterated twice: TOC and plates
+    start_pos = fileobj.tell() if hasattr(fileobj, "tell") else 0
+
+    c = canvas.Canvas(fileobj, pagesize=letter)
+
+    with metrics.phase("cover"):
+        draw_cover_page(c, data["course"], data["term"], cover_image, cover_dpi=cover_dpi)
+        metrics.show_page(c)
+
+    with metrics.phase("toc"):
+        draw_toc(c, lessons, show_page=lambda: metrics.show_page(c))
+        metrics.show_page(c)
+
+    with metrics.phase("plates"):
+        for lesson in lessons:
+            draw_plate(c, lesson)
+            metrics.show_page(c)
+            metrics.plates += 1
+            if lesson.get("presentation"):
+                metrics.presentation_plates += 1
+
+    with metrics.phase("save"):
+        c.save()
+
+    if isinstance(fileobj, str):
+        metrics.output_bytes = os.path.getsize(fileobj)
+    elif hasattr(fileobj, "tell"):
+        metrics.output_bytes = fileobj.tell() - start_pos
 
-    c.showPage()
+# =============================================================================
+# PREVIEW
+# =============================================================================
+
+PREVIEW_DPI = 100
+
+def render_preview(data, pages=("cover", "toc", 0), cover_image=None, dpi=PREVIEW_DPI):
+    """Rasterize a few pages of a platebook without building the whole book.
 
-    for lesson in data["lessons"]:
-        if lesson.get("presentation"):
-            draw_presentation_plate(c, lesson["plate_number"], lesson["date"])
+    pages: "cover", "toc" (first TOC page) or a lesson index into data["lessons"].
+    Returns a list of PNG bytes, one per requested page. Needs PyMuPDF.
+    """
+    import fitz  # PyMuPDF
+
+    lessons = list(data["lessons"])
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
+    for page in pages:
+        if page == "cover":
+            draw_cover_page(c, data["course"], data["term"], cover_image, cover_dpi=dpi)
+        elif page == "toc":
+            draw_toc(c, lessons[:TOC_FIRST_PAGE_ENTRIES])
         else:
-            draw_standard_plate(c,
-                                lesson["plate_number"],
-                                lesson["title"],
-                                lesson["date"])
+            draw_plate(c, lessons[page])
         c.showPage()
-
     c.save()
 
-if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python platebook.py lessons.json output.pdf")
-        sys.exit(1)
+    zoom = dpi / 72
+    with fitz.open(stream=buffer.getvalue(), filetype="pdf") as doc:
+        return [p.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png") for p in doc]
 
-    generate(sys.argv[1], sys.argv[2])
+# =============================================================================
+# STREAMING (large lesson sets)
+# =============================================================================
+
+TOC_FORM = "TOCPage{}"
+
+def iter_jsonl_lessons(f):
+    """Yield lesson dicts from a JSON Lines file object, one per line"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+# Accepted header names (lower-case) for each lesson field
+PLATE_COLUMNS = ("plate_number", "plate", "plate #", "plate no", "plate no.", "#", "number")
+TITLE_COLUMNS = ("title", "lesson title", "lesson", "topic")
+DATE_COLUMNS = ("date", "day")
+
+def _find_column(header, names):
+    for i, name in enumerate(header):
+        if name in names:
+            return i
+    return None
+
+def iter_csv_lessons(lines):
+    """Yield lesson dicts lazily from CSV lines (a file object or any iterable).
+
+    The header row is matched by name (Plate/plate_number, Title, Date, in
+    any order); if it is not recognized the columns are taken as
+    Plate, Date, Title. Blank rows are skipped. Raises ValueError for a row
+    with a missing field or a non-integer plate number.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip().lstrip("\ufeff").lower() for name in header]
+
+    plate_col = _find_column(header, PLATE_COLUMNS)
+    title_col = _find_column(header, TITLE_COLUMNS)
+    date_col = _find_column(header, DATE_COLUMNS)
+    if None in (plate_col, title_col, date_col):
+        plate_col, date_col, title_col = 0, 1, 2  # Column order of the published sheet
+
+    needed = max(plate_col, title_col, date_col) + 1
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) < needed:
+            raise ValueError(f"CSV line {reader.line_num}: expected {needed} columns, got {len(row)}")
+        plate = row[plate_col].strip()
+        try:
+            plate_number = int(plate)
+        except ValueError:
+            raise ValueError(f"CSV line {reader.line_num}: invalid plate number {plate!r}")
+        yield {
+            "plate_number": plate_number,
+            "title": row[title_col].strip(),
+            "date": row[date_col].strip(),
+        }
+
+def parse_csv_text(csv_text):
+    """Yield lesson dicts from CSV text (see iter_csv_lessons)"""
+    return iter_csv_lessons(io.StringIO(csv_text, newline=""))
+
+def generate_streaming(course, term, lessons, fileobj, lesson_count,
+                       cover_image=None, metrics=None, cover_dpi=COVER_DPI):
+    """Render a platebook from an iterator of lessons without holding them all.
+
+    Plates are drawn as lessons arrive; only (plate, title, date) is kept
+    for the TOC. lesson_count sizes the TOC up front: its pages are
+    reserved as form XObjects that are filled in after the last plate.
+    Raises ValueError if the iterator yields a different number of lessons.
+    """
+    if metrics is None:
+        metrics = RenderMetrics()
+    toc_pages = toc_page_count(lesson_count)
+    toc_entries = []  # Compact (plate_number, title, date) records
+
+    c = canvas.Canvas(fileobj, pagesize=letter)
+
+    with metrics.phase("cover"):
+        draw_cover_page(c, course, term, cover_image, cover_dpi=cover_dpi)
+        metrics.show_page(c)
+
+    # Reserve the TOC pages; their content is defined once all plates are seen
+    for page in range(toc_pages):
+        c.doForm(TOC_FORM.format(page))
+        metrics.show_page(c)
+
+    with metrics.phase("plates"):
+        for lesson in lessons:
+            draw_plate(c, lesson)
+            metrics.show_page(c)
+            metrics.plates += 1
+            if lesson.get("presentation"):
+                metrics.presentation_plates += 1
+            toc_entries.append((lesson["plate_number"], lesson["title"], lesson["date"]))
+
+    if len(toc_entries) != lesson_count:
+        raise ValueError(f"Expected {lesson_count} lessons, got {len(toc_entries)}")
+
+    with metrics.phase("toc"):
+        page = 0
+        def next_toc_page():
+            nonlocal page
+            c.endForm()
+            page += 1
+            c.beginForm(TOC_FORM.format(page))
+
+        c.beginForm(TOC_FORM.format(page))
+        draw_toc(c, ({"plate_number": n, "title": t, "date": d} for n, t, d in toc_entries),
+                 show_page=next_toc_page)
+        c.endForm()
+
+    with metrics.phase("save"):
+        c.save()
+
+def count_lessons(lessons_path):
+    """Count lessons in a .jsonl or .csv file without keeping them"""
+    with open(lessons_path, newline="") as f:
+        if lessons_path.lower().endswith(".csv"):
+            return sum(1 for _ in iter_csv_lessons(f))  # Also validates every row
+        return sum(1 for line in f if line.strip())
+
+def generate_streaming_file(lessons_path, output_pdf, course, term,
+                            cover_image_path=None, metrics=None):
+    """Stream lessons from a .jsonl or .csv file into a platebook PDF"""
+    if metrics is None:
+        metrics = RenderMetrics()
+    with metrics.phase("count"):
+        lesson_count = count_lessons(lessons_path)
+
+    with open(lessons_path, newline="") as f:
+        if lessons_path.lower().endswith(".csv"):
+            lessons = iter_csv_lessons(f)
+        else:
+            lessons = iter_jsonl_lessons(f)
+        generate_streaming(course, term, lessons, output_pdf, lesson_count,
+                           cover_image=cover_image_path, metrics=metrics)
+    metrics.output_bytes = os.path.getsize(output_pdf)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a platebook PDF")
+    parser.add_argument("lessons", help="Lessons JSON file, or .jsonl/.csv to stream")
+    parser.add_argument("output", help="Output PDF file")
+    parser.add_argument("--course", default="HIST 213 East Asia in the Modern World",
+                        help="Course name (streamed .jsonl/.csv input only)")
+    parser.add_argument("--term", default="Winter 2026",
+                        help="Term name (streamed .jsonl/.csv input only)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-phase timings and counts")
+    args = parser.parse_args()
+
+    metrics = RenderMetrics()
+    if args.lessons.lower().endswith((".jsonl", ".csv")):
+        generate_streaming_file(args.lessons, args.output, args.course, args.term,
+                                metrics=metrics)
+    else:
+        generate(args.lessons, args.output, metrics=metrics)
+    if args.profile:
+        print(f"Rendered {args.output}")
+        print(metrics.report())
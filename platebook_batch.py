@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Platebook Batch Generator
+Render many courses' platebooks in one run, in parallel across cores.
+
+Usage:
+    python platebook_batch.py manifest.json
+    python platebook_batch.py manifest.csv --jobs 4 --report batch_report.json
+
+The manifest is a JSON list or a CSV with these columns:
+    course, term, sheet_url or csv_file, output
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import platebook
+import platebook_fetch
+from platebook_cache import generate_cached
+from platebook_from_sheets import parse_csv_to_lessons
+
+def load_manifest(path):
+    """Read manifest entries from a JSON list or a CSV file"""
+    with open(path, newline='') as f:
+        if path.lower().endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+
+    for i, entry in enumerate(entries, 1):
+        if not entry.get('output'):
+            raise ValueError(f"Manifest entry {i} has no output")
+        if not (entry.get('sheet_url') or entry.get('csv_file')):
+            raise ValueError(f"Manifest entry {i} needs sheet_url or csv_file")
+    return entries
+
+def build_platebook(entry, use_cache=True):
+    """Fetch, parse and render one manifest entry. Runs in a worker process."""
+    result = {"output": entry["output"], "ok": False}
+    start = time.perf_counter()
+    try:
+        if entry.get('sheet_url'):
+            csv_text = platebook_fetch.fetch_text(entry['sheet_url'])
+        else:
+            with open(entry['csv_file'], 'r') as f:
+                csv_text = f.read()
+        lessons = parse_csv_to_lessons(csv_text)
+        fetched = time.perf_counter()
+
+        data = {
+            "course": entry.get('course') or 'HIST 213 East Asia in the Modern World',
+            "term": entry.get('term') or 'Winter 2026',
+            "lessons": lessons
+        }
+        with open(entry['output'], 'wb') as f:
+            if use_cache:
+                f.write(generate_cached(data))
+            else:
+                platebook.generate_to_stream(data, f)
+        done = time.perf_counter()
+
+        result.update(ok=True, plates=len(lessons),
+                      fetch_seconds=round(fetched - start, 3),
+                      render_seconds=round(done - fetched, 3),
+                      bytes=os.path.getsize(entry['output']))
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate many platebooks from a manifest')
+    parser.add_argument('manifest', help='Manifest file (.json or .csv)')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help='Number of platebooks rendered in parallel')
+    parser.add_argument('--report', help='Write a JSON summary report to this file')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-render PDFs')
+    args = parser.parse_args()
+
+    entries = load_manifest(args.manifest)
+    print(f"Rendering {len(entries)} platebooks with {args.jobs} workers...")
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(build_platebook, entry, not args.no_cache) for entry in entries]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result["ok"]:
+                print(f"✓ {result['output']} ({result['plates']} plates, {result['seconds']}s)")
+            else:
+                print(f"✗ {result['output']}: {result['error']}")
+
+    failed = [r for r in results if not r["ok"]]
+    total = round(time.perf_counter() - start, 3)
+    print(f"\nDone in {total}s: {len(results) - len(failed)} succeeded, {len(failed)} failed")
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({"total_seconds": total, "jobs": args.jobs, "results": results}, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Platebook Benchmark
+Times platebook rendering on synthetic books of different sizes.
+
+Usage:
+    python platebook_bench.py --output bench.json
+    python platebook_bench.py --sizes 10 100 --compare bench.json
+
+Each book size runs in a fresh process so peak RSS is per size.
+Timings are the best of --repeat runs.
+"""
+
+import argparse
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+import platebook
+
+SIZES = [10, 100, 1000, 10000]
+CSV_ROWS = 100000
+PRESENTATION_EVERY = 10  # Every 10th plate is a presentation plate
+LONG_TITLE = ("Confucian Analects, Mencius and the Great Learning / "
+              "Zhuangzi selections / Daodejing chapters 1-20 / Legalist responses "
+              "to Warring States disorder")
+
+def synthetic_data(num_plates):
+    """Book with mixed plate types and alternating short and long titles"""
+    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
+    lessons = []
+    for i in range(1, num_plates + 1):
+        lesson = {
+            "plate_number": i,
+            "title": LONG_TITLE if i % 2 else f"Lesson {i}",
+            "date": f"{months[(i // 28) % len(months)]} {i % 28 + 1}",
+        }
+        if i % PRESENTATION_EVERY == 0:
+            lesson["presentation"] = True
+        lessons.append(lesson)
+    return {"course": "Benchmark Course", "term": "Winter 2026", "lessons": lessons}
+
+def best_of(repeat, fn):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def time_plates(lessons, repeat):
+    """Seconds to draw the given plates (plus showPage) on a fresh canvas"""
+    def run():
+        c = canvas.Canvas(io.BytesIO(), pagesize=letter)
+        for lesson in lessons:
+            platebook.draw_plate(c, lesson)
+            c.showPage()
+    return best_of(repeat, run)
+
+def run_case(num_plates, repeat):
+    data = synthetic_data(num_plates)
+    lessons = data["lessons"]
+    standard = [l for l in lessons if not l.get("presentation")]
+    presentation = [l for l in lessons if l.get("presentation")]
+
+    pdf_size = 0
+    def generate():
+        nonlocal pdf_size
+        buffer = io.BytesIO()
+        platebook.generate_to_stream(data, buffer)
+        pdf_size = len(buffer.getvalue())
+
+    def toc():
+        platebook.draw_toc(canvas.Canvas(io.BytesIO(), pagesize=letter), lessons)
+
+    result = {
+        "plates": num_plates,
+        "generate_seconds": best_of(repeat, generate),
+        "toc_seconds": best_of(repeat, toc),
+        "standard_plate_ms": time_plates(standard, repeat) * 1000 / max(len(standard), 1),
+        "presentation_plate_ms": time_plates(presentation, repeat) * 1000 / max(len(presentation), 1),
+        "pdf_bytes": pdf_size,
+    }
+
+    result["peak_rss_mb"] = None
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux, bytes on macOS
+        result["peak_rss_mb"] = peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return result
+
+def bench_csv(rows, repeat):
+    """Time platebook.parse_csv_text on a sheet with quoted, comma-heavy titles"""
+    lines = ["Plate,Date,Title"]
+    for i in range(1, rows + 1):
+        lines.append(f'{i},Jan {i % 28 + 1},"{LONG_TITLE}, part {i}"')
+    csv_text = "\n".join(lines) + "\n"
+
+    def parse():
+        for _ in platebook.parse_csv_text(csv_text):
+            pass
+
+    return {"rows": rows, "bytes": len(csv_text), "parse_seconds": best_of(repeat, parse)}
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results, baseline=None):
+    base = {r["plates"]: r for r in baseline["results"]} if baseline else {}
+    columns = ["generate_seconds", "toc_seconds", "standard_plate_ms",
+               "presentation_plate_ms", "pdf_bytes", "peak_rss_mb"]
+    print(f"{'plates':>7} " + " ".join(f"{c:>22}" for c in columns))
+    for r in results:
+        cells = []
+        for col in columns:
+            if r[col] is None:
+                cells.append(f"{'-':>22}")
+                continue
+            cell = f"{r[col]:.4g}"
+            old = base.get(r["plates"], {}).get(col)
+            if old:
+                cell += f" ({r[col] / old:.2f}x)"
+            cells.append(f"{cell:>22}")
+        print(f"{r['plates']:>7} " + " ".join(cells))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark platebook rendering')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Plate counts to benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    parser.add_argument('--csv-rows', type=int, default=CSV_ROWS,
+                        help='Rows in the CSV parsing benchmark (0 to skip)')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        print(f"Benchmarking {size} plates...")
+        # Fresh process per size so peak RSS is not inherited from larger runs
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(run_case, size, args.repeat).result())
+
+    csv_result = None
+    if args.csv_rows:
+        print(f"Benchmarking CSV parsing ({args.csv_rows} rows)...")
+        csv_result = bench_csv(args.csv_rows, args.repeat)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+        "csv": csv_result,
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare} (commit {baseline.get('commit')})")
+    print()
+    print_results(results, baseline)
+    if csv_result:
+        line = f"\nCSV: {csv_result['rows']} rows parsed in {csv_result['parse_seconds']:.3f}s"
+        old = (baseline or {}).get("csv") or {}
+        if old.get("rows") == csv_result["rows"] and old.get("parse_seconds"):
+            line += f" ({csv_result['parse_seconds'] / old['parse_seconds']:.2f}x)"
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Platebook PDF Cache
+Content-addressed on-disk cache of rendered platebooks.
+
+The key is a hash of the normalized lesson data, the cover image bytes
+and platebook.LAYOUT_VERSION, so identical requests skip rendering.
+Least recently used PDFs are evicted once the cache exceeds its size cap.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import platebook
+
+CACHE_DIR = Path(".platebook_cache")
+MAX_CACHE_BYTES = 200 * 1024 * 1024  # 200 MB
+
+def cache_key(data, cover_bytes=None):
+    """Stable hash of everything that affects the rendered PDF"""
+    normalized = {
+        "course": data.get("course"),
+        "term": data.get("term"),
+        "lessons": [dict(lesson) for lesson in data["lessons"]],
+    }
+    h = hashlib.sha256()
+    h.update(f"layout:{platebook.LAYOUT_VERSION}\n".encode("utf-8"))
+    h.update(json.dumps(normalized, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    h.update(b"\ncover:")
+    if cover_bytes:
+        h.update(hashlib.sha256(cover_bytes).digest())
+    return h.hexdigest()
+
+class PDFCache:
+    """On-disk LRU store of rendered PDFs, safe to share between processes."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return self.directory / f"{key}.pdf"
+
+    def get(self, key):
+        """Return cached PDF bytes, or None on a miss."""
+        path = self._path(key)
+        try:
+            pdf_bytes = path.read_bytes()
+            os.utime(path)  # Mark as recently used
+        except FileNotFoundError:
+            return None
+        return pdf_bytes
+
+    def put(self, key, pdf_bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write then rename so readers never see a partial PDF
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(pdf_bytes)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used PDFs until the cache fits max_bytes."""
+        entries = []
+        for path in self.directory.glob("*.pdf"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def read_cover(cover_image):
+    """Return cover image bytes from a path or binary file object."""
+    if cover_image is None:
+        return None
+    if isinstance(cover_image, (str, os.PathLike)):
+        with open(cover_image, "rb") as f:
+            return f.read()
+    return cover_image.read()
+
+def generate_cached(data, cover_image=None, cache=None):
+    """Render a platebook to bytes, reusing a cached PDF when possible.
+
+    cover_image may be a path or a binary file object.
+    """
+    if cache is None:
+        cache = PDFCache()
+    data = dict(data, lessons=list(data["lessons"]))
+    cover_bytes = read_cover(cover_image)
+
+    key = cache_key(data, cover_bytes)
+    pdf_bytes = cache.get(key)
+    if pdf_bytes is not None:
+        return pdf_bytes
+
+    buffer = io.BytesIO()
+    cover = io.BytesIO(cover_bytes) if cover_bytes else None
+    platebook.generate_to_stream(data, buffer, cover_image=cover)
+    pdf_bytes = buffer.getvalue()
+    cache.put(key, pdf_bytes)
+    return pdf_bytes
@@ -0,0 +1,86 @@
+"""
+Platebook Sheet Fetcher
+Shared HTTP layer for downloading published Google Sheet CSVs.
+
+Responses are kept on disk per URL. Within FETCH_TTL seconds the cached
+text is returned without touching the network; after that the request is
+revalidated with If-None-Match / If-Modified-Since, and a 304 reuses the
+cached body. One pooled requests.Session is shared by all callers.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+FETCH_CACHE_DIR = Path(".platebook_cache") / "sheets"
+FETCH_TTL = 60  # Seconds to trust a cached sheet without revalidating
+FETCH_TIMEOUT = 10
+
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+_session.headers["User-Agent"] = "PlatebookGenerator/1.0"
+
+def _cache_path(url, cache_dir):
+    return Path(cache_dir) / (hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+def _load_entry(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _store_entry(path, entry):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so concurrent readers never see a partial entry
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def fetch_text(url, ttl=FETCH_TTL, timeout=FETCH_TIMEOUT, cache_dir=FETCH_CACHE_DIR):
+    """Fetch a URL as text, reusing the on-disk copy when it is still valid.
+
+    Raises requests.RequestException on network or HTTP errors.
+    """
+    path = _cache_path(url, cache_dir)
+    entry = _load_entry(path)
+    now = time.time()
+
+    if entry and now - entry["fetched_at"] < ttl:
+        return entry["text"]
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
+    response = _session.get(url, headers=headers, timeout=timeout)
+
+    if response.status_code == 304 and entry:
+        entry["fetched_at"] = now
+        _store_entry(path, entry)
+        return entry["text"]
+
+    response.raise_for_status()
+    _store_entry(path, {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": now,
+        "text": response.text,
+    })
+    return response.text
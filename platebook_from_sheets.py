@@ -4,45 +4,22 @@ HIST 213 Platebook Generator - Google Sheets Edition
 """
 
 import sys
-import json
 import argparse
 import platebook  # Import the original generator
-
-try:
-    import requests
-except ImportError:
-    print("Missing requests. Run: pip install requests")
-    sys.exit(1)
+from platebook_cache import generate_cached
+import platebook_fetch
 
 def fetch_google_sheet_csv(url):
     """Fetch CSV data from a published Google Sheet"""
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        return response.text
+        return platebook_fetch.fetch_text(url)
     except Exception as e:
         print(f"Error fetching Google Sheet: {e}")
         sys.exit(1)
 
 def parse_csv_to_lessons(csv_text):
     """Parse CSV text into lessons format"""
-    lessons = []
-    lines = csv_text.strip().split('\n')
-    
-    # Skip header row
-    for line in lines[1:]:
-        if not line.strip():
-            continue
-        
-        parts = line.split(',')
-        if len(parts) >= 3:
-            lessons.append({
-                "plate_number": int(parts[0].strip()),
-                "date": parts[1].strip().replace('"', ''),
-                "title": parts[2].strip().replace('"', '')
-            })
-    
-    return lessons
+    return list(platebook.parse_csv_text(csv_text))
 
 def main():
     parser = argparse.ArgumentParser(description='Generate platebook from Google Sheets')
@@ -51,6 +28,7 @@ def main():
     parser.add_argument('--course', default='HIST 213 East Asia in the Modern World', help='Course name')
     parser.add_argument('--term', default='Winter 2026', help='Term name')
     parser.add_argument('--output', default='platebook.pdf', help='Output PDF filename')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-render the PDF')
     
     args = parser.parse_args()
     
@@ -77,19 +55,13 @@ def main():
         "lessons": lessons
     }
     
-    # Save temp JSON
-    temp_json = "_temp_lessons.json"
-    with open(temp_json, 'w') as f:
-        json.dump(data, f, indent=2)
-
     # Call the original generator
     print(f"Generating PDF: {args.output}")
-    platebook.generate(temp_json, args.output)
-    
-    # Clean up
-    import os
-    if os.path.exists(temp_json):
-        os.remove(temp_json)
+    with open(args.output, 'wb') as f:
+        if args.no_cache:
+            platebook.generate_to_stream(data, f)
+        else:
+            f.write(generate_cached(data))
         
     print(f"✓ Success! Created {args.output}")
 
@@ -4,87 +4,335 @@ Platebook Local Web Server
 Hosts the web interface and handles perfect PDF generation.
 """
 
+import argparse
 import http.server
-import socketserver
+import io
 import json
+import multiprocessing
 import os
-import sys
-import shutil
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import platebook_fetch
 import platebook_from_sheets  # Import the logic we already wrote
-from platebook import generate    # The perfect generator
+from platebook_cache import PDFCache, cache_key
+from platebook import RenderMetrics, generate_to_stream    # The perfect generator
 
 PORT = 8000
+WORKERS = 8  # Concurrent requests; most time is spent waiting on Google Sheets
+RENDER_PROCESSES = os.cpu_count() or 1  # ReportLab is CPU-bound, so one per core
+MAX_QUEUED_REQUESTS = 16  # Connections allowed to wait for a worker before we return 429
+JOB_TIMEOUT = 60  # Seconds a request waits for its PDF
+REJECT_DRAIN_TIMEOUT = 1  # Seconds to read a rejected request before closing it
+
+def ignore_sigint():
+    """Leave Ctrl+C to the server process; it shuts the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def render_pdf(data):
+    """Render a platebook (runs in a render process).
+
+    Returns the PDF bytes and the RenderMetrics as a dict.
+    """
+    buffer = io.BytesIO()
+    metrics = RenderMetrics()
+    generate_to_stream(data, buffer, metrics=metrics)
+    return buffer.getvalue(), metrics.as_dict()
+
+class ServerMetrics:
+    """Thread-safe counters and summaries, exported in Prometheus text format."""
+
+    FAMILIES = {
+        "platebook_http_requests_total": ("counter", "HTTP responses by endpoint and status code."),
+        "platebook_generate_seconds": ("summary", "Wall time of /generate requests."),
+        "platebook_pdf_cache_lookups_total": ("counter", "PDF cache lookups by result."),
+        "platebook_render_phase_seconds": ("summary", "Render time per generate_to_stream phase."),
+        "platebook_plates_rendered_total": ("counter", "Plates rendered."),
+        "platebook_pages_rendered_total": ("counter", "PDF pages rendered."),
+        "platebook_render_page_fragments_total": ("counter", "ReportLab content fragments (about one per drawing call) written to pages; excludes form XObjects."),
+        "platebook_pdf_bytes_total": ("counter", "Bytes of rendered PDF output."),
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}  # (family, suffix, labels) -> value
+
+    def _add(self, family, suffix, amount, labels):
+        key = (family, suffix, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def inc(self, family, amount=1, **labels):
+        self._add(family, "", amount, labels)
+
+    def observe(self, family, value, **labels):
+        self._add(family, "_sum", value, labels)
+        self._add(family, "_count", 1, labels)
+
+    def observe_render(self, render_metrics):
+        for phase, seconds in render_metrics["phases"].items():
+            self.observe("platebook_render_phase_seconds", seconds, phase=phase)
+        self.inc("platebook_plates_rendered_total", render_metrics["plates"])
+        self.inc("platebook_pages_rendered_total", render_metrics["pages"])
+        self.inc("platebook_render_page_fragments_total", render_metrics["page_fragments"])
+        self.inc("platebook_pdf_bytes_total", render_metrics["output_bytes"])
+
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = []
+        for family, (kind, help_text) in self.FAMILIES.items():
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            for (name, suffix, labels), value in values:
+                if name != family:
+                    continue
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+                label_text = "{" + label_text + "}" if label_text else ""
+                lines.append(f"{family}{suffix}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+class RenderQueue:
+    """PDF render jobs on a persistent process pool.
+
+    A render that overruns its timeout cannot be cancelled inside a pool
+    process, so the whole pool is replaced and its processes killed. Jobs
+    of other requests caught in that pool are retried once on the new one.
+    """
+
+    def __init__(self, processes=RENDER_PROCESSES):
+        self.processes = processes
+        self.lock = threading.Lock()
+        self.pool = self._new_pool()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.processes,
+                                   mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=ignore_sigint)
+
+    def recycle(self, pool):
+        """Replace pool (if still current) and kill its processes."""
+        with self.lock:
+            if self.pool is not pool:
+                return  # Another request already replaced it
+            self.pool = self._new_pool()
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, data, timeout):
+        """Render data in a pool process. Returns (pdf_bytes, metrics dict).
+
+        Raises TimeoutError after `timeout` seconds, recycling the pool.
+        A pool broken by a dead worker is recycled too, and the job retried once.
+        """
+        deadline = time.monotonic() + timeout
+        for attempt in range(2):
+            try:
+                with self.lock:
+                    pool = self.pool
+                    future = pool.submit(render_pdf, data)
+                return future.result(timeout=max(0, deadline - time.monotonic()))
+            except TimeoutError:
+                self.recycle(pool)
+                raise
+            except BrokenProcessPool:
+                self.recycle(pool)
+                if attempt:
+                    raise
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
 
 class PlatebookHandler(http.server.SimpleHTTPRequestHandler):
+    def send_response(self, code, message=None):
+        # path is unset if the request line could not be parsed
+        path = getattr(self, "path", None)
+        endpoint = path if path in ('/generate', '/metrics') else 'static'
+        self.server.metrics.inc("platebook_http_requests_total", endpoint=endpoint, code=code)
+        super().send_response(code, message)
+
+    def send_metrics(self):
+        body = self.server.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", len(body))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_pdf(self, pdf_bytes, filename):
+        """Send PDF back to browser"""
+        self.send_response(200)
+        self.send_header("Content-type", "application/pdf")
+        self.send_header("Content-Disposition", f"attachment; filename={filename}")
+        self.send_header("Content-Length", len(pdf_bytes))
+        self.end_headers()
+        self.wfile.write(pdf_bytes)
+        print("✅ PDF sent to browser!")
+
     def do_GET(self):
+        if self.path == '/metrics':
+            self.send_metrics()
+            return
         if self.path == '/':
             self.path = '/platebook_generator.html'
         return http.server.SimpleHTTPRequestHandler.do_GET(self)
 
     def do_POST(self):
         if self.path == '/generate':
-            content_length = int(self.headers['Content-Length'])
-            post_data = self.rfile.read(content_length)
-            request = json.loads(post_data.decode('utf-8'))
+            start = time.perf_counter()
+            try:
+                self.handle_generate()
+            finally:
+                self.server.metrics.observe("platebook_generate_seconds",
+                                            time.perf_counter() - start)
+
+    def handle_generate(self):
+        content_length = int(self.headers['Content-Length'])
+        post_data = self.rfile.read(content_length)
+        request = json.loads(post_data.decode('utf-8'))
+        
+        sheet_url = request.get('url')
+        if not sheet_url:
+            self.send_error(400, "Missing URL")
+            return
+
+        try:
+            print(f"📥 Received request for: {sheet_url}")
             
-            sheet_url = request.get('url')
-            if not sheet_url:
-                self.send_error(400, "Missing URL")
+            # Fetch and Parse
+            csv_text = platebook_fetch.fetch_text(sheet_url)
+            lessons = platebook_from_sheets.parse_csv_to_lessons(csv_text)
+            
+            # Create Data
+            data = {
+                "course": "HIST 213 East Asia in the Modern World",
+                "term": "Winter 2026",
+                "lessons": lessons
+            }
+            
+            output_filename = "HIST213_Platebook_Winter2026.pdf"
+            pdf_cache = self.server.pdf_cache
+            key = cache_key(data) if pdf_cache else None
+            pdf_bytes = pdf_cache.get(key) if pdf_cache else None
+            if pdf_cache:
+                self.server.metrics.inc("platebook_pdf_cache_lookups_total",
+                                        result="hit" if pdf_bytes is not None else "miss")
+            if pdf_bytes is not None:
+                print("⚡ Serving cached PDF")
+                self.send_pdf(pdf_bytes, output_filename)
                 return
 
+            # Generate PDF in a render process - no temp files on disk
             try:
-                print(f"📥 Received request for: {sheet_url}")
-                
-                # Fetch and Parse
-                csv_text = platebook_from_sheets.fetch_google_sheet_csv(sheet_url)
-                lessons = platebook_from_sheets.parse_csv_to_lessons(csv_text)
-                
-                # Create Data
-                data = {
-                    "course": "HIST 213 East Asia in the Modern World",
-                    "term": "Winter 2026",
-                    "lessons": lessons
-                }
-                
-                # Generate PDF to temp file
-                output_filename = "HIST213_Platebook_Winter2026.pdf"
-                temp_json = "_temp_server_lessons.json"
-                
-                with open(temp_json, 'w') as f:
-                    json.dump(data, f, indent=2)
-                
-                # Generate using the PERFECT generator
-                generate(temp_json, output_filename)
-                
-                # Clean up json
-                if os.path.exists(temp_json):
-                    os.remove(temp_json)
-
-                # Send PDF back to browser
-                file_size = os.path.getsize(output_filename)
-                
-                self.send_response(200)
-                self.send_header("Content-type", "application/pdf")
-                self.send_header("Content-Disposition", f"attachment; filename={output_filename}")
-                self.send_header("Content-Length", file_size)
-                self.end_headers()
-                
-                with open(output_filename, 'rb') as f:
-                    shutil.copyfileobj(f, self.wfile)
-                    
-                print("✅ PDF sent to browser!")
-                
-            except Exception as e:
-                print(f"❌ Error: {e}")
-                self.send_error(500, str(e))
+                pdf_bytes, render_metrics = self.server.render_queue.render(
+                    data, self.server.job_timeout)
+            except TimeoutError:
+                print(f"⌛ Render timed out after {self.server.job_timeout}s")
+                self.send_error(504, "PDF generation timed out")
+                return
+
+            self.server.metrics.observe_render(render_metrics)
+            if pdf_cache:
+                pdf_cache.put(key, pdf_bytes)
+            self.send_pdf(pdf_bytes, output_filename)
+            
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            self.send_error(500, str(e))
+
+class ThreadPoolHTTPServer(http.server.HTTPServer):
+    """HTTPServer that handles each connection on a bounded thread pool.
+
+    A slow Google Sheet fetch only ties up one worker, and the worker
+    count caps how many requests render at once. Connections beyond
+    workers + max_queued are answered with 429 as soon as they arrive.
+    """
+
+    def __init__(self, server_address, handler_class, workers=WORKERS,
+                 render_queue=None, job_timeout=JOB_TIMEOUT, pdf_cache=None,
+                 max_queued=MAX_QUEUED_REQUESTS):
+        super().__init__(server_address, handler_class)
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="platebook-worker")
+        # One slot per connection being handled or waiting for a worker
+        self.slots = threading.BoundedSemaphore(workers + max_queued)
+        self.render_queue = render_queue
+        self.job_timeout = job_timeout
+        self.pdf_cache = pdf_cache
+        self.metrics = ServerMetrics()
+
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            threading.Thread(target=self.reject_request, args=(request,), daemon=True).start()
             return
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def reject_request(self, request):
+        """Answer 429 without parsing the request; every worker is busy."""
+        print("⏳ Server busy, rejecting request")
+        self.metrics.inc("platebook_http_requests_total", endpoint="rejected", code=429)
+        try:
+            request.sendall(b"HTTP/1.1 429 Too Many Requests\r\n"
+                            b"Retry-After: 5\r\nContent-Length: 0\r\n"
+                            b"Connection: close\r\n\r\n")
+            # Drain what the client sent so closing doesn't reset the connection
+            request.shutdown(socket.SHUT_WR)
+            request.settimeout(REJECT_DRAIN_TIMEOUT)
+            while request.recv(65536):
+                pass
+        except OSError:
+            pass
+        self.close_request(request)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Platebook local web server')
+    parser.add_argument('--port', type=int, default=PORT, help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='Number of requests handled concurrently')
+    parser.add_argument('--render-processes', type=int, default=RENDER_PROCESSES,
+                        help='Number of PDF render processes')
+    parser.add_argument('--max-queued', type=int, default=MAX_QUEUED_REQUESTS,
+                        help='Connections allowed to wait for a worker before returning 429')
+    parser.add_argument('--job-timeout', type=float, default=JOB_TIMEOUT,
+                        help='Seconds to wait for a PDF before returning 504 '
+                             '(the render pool is restarted to stop the job)')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-render PDFs')
+    args = parser.parse_args()
+
+    render_queue = RenderQueue(args.render_processes)
+
+    print(f"🚀 Platebook Server running at http://localhost:{args.port} "
+          f"({args.workers} workers, {args.render_processes} render processes)")
+    print("Press Ctrl+C to stop")
 
-print(f"🚀 Platebook Server running at http://localhost:{PORT}")
-print("Press Ctrl+C to stop")
+    try:
+        with ThreadPoolHTTPServer(("", args.port), PlatebookHandler, workers=args.workers,
+                                  render_queue=render_queue,
+                                  job_timeout=args.job_timeout,
+                                  max_queued=args.max_queued,
+                                  pdf_cache=None if args.no_cache else PDFCache()) as httpd:
+            httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping server...")
+    finally:
+        render_queue.shutdown()
 
-# Python 3.7+ threading
-try:
-    with socketserver.TCPServer(("", PORT), PlatebookHandler) as httpd:
-        httpd.serve_forever()
-except KeyboardInterrupt:
-    print("\nStopping server...")
+if __name__ == "__main__":
+    main()
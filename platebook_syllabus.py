@@ -0,0 +1,170 @@
+"""
+Platebook Syllabus Parser
+Turns pasted syllabus text into course/term info and a list of lessons.
+
+All patterns are compiled once at import. Title cleaning runs the rules in
+CLEAN_RULES in order; several rules cut a title off at a keyword, so their
+order matters and they are kept as separate passes.
+"""
+
+import re
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+MAX_TITLE_LENGTH = 120
+HEADER_SCAN_LINES = 15
+
+TERM_RE = re.compile(r'(Fall|Winter|Spring|Summer)\s+\d{4}', re.IGNORECASE)
+
+# "1/5" or "1 / 5" (optionally preceded by day)
+SLASH_DATE_RE = re.compile(r'^(?:[A-Za-z]{2,10}\s*,?\s*)?(\d{1,2})\s*/\s*(\d{1,2})')
+# "Jan 6" (optionally preceded by day like "Mon, Jan 6")
+TEXT_DATE_RE = re.compile(r'^(?:[A-Za-z]{2,10}\s*,?\s*)?(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+(\d{1,2})', re.IGNORECASE)
+# "7 Book of Songs" or just "7" (only if we have a current month)
+BARE_DAY_RE = re.compile(r'^(\d{1,2})(?:\s+(.*))?$')
+
+QUOTES = str.maketrans('', '', '“”"')
+WHITESPACE_RE = re.compile(r'\s+')
+
+def _rule(pattern, flags=re.IGNORECASE):
+    return re.compile(pattern, flags)
+
+# Title noise, removed in this order (Make it SHORT and COGENT)
+CLEAN_RULES = [
+    _rule(r'^ANTHOLOGY:\s*'),
+    # Parentheses: page numbers, dates, translators
+    _rule(r'\s*\(.*?\)', 0),
+    _rule(r'\b\w+\s+Dynasty\b'),
+    None,  # Quotes (str.translate)
+    # Bibliographic info
+    _rule(r'pp\.?\s*\d+[-–]\d+'),
+    _rule(r'Vol\.?\s*\d+'),
+    _rule(r'New York:.*'),
+    # Common author names
+    _rule(r'\b(Ivanhoe|Van Norden|Birch|Turner|Slingerland|Kjellberg|Hutton|Harris)\b[:,\s]*'),
+    # Generic "Introduction," / "Introduction:"
+    _rule(r'^Introduction\s*[,:]\s*'),
+    # Assignments/papers
+    _rule(r'PAPER #\d+.*'),
+    _rule(r'Final paper.*'),
+    _rule(r'Preliminary Thesis.*'),
+    _rule(r'.*Due\s*(?:today|on|by).*'),
+    # Markdown links
+    _rule(r'\[.*?\]\s*\(https?://.*?\)', 0),
+    _rule(r'Week\s+\d+[:\s]*'),
+    _rule(r'^(?:Readings?|Discussion|Watch|Recommended|Optional|Listen to)[:\s]*'),
+    _rule(r'Blast from the past.*'),
+    # "Story of..." also covers "The Story of..."
+    _rule(r'Story of.*'),
+    _rule(r'Funny story.*'),
+    _rule(r'Selections from.*'),
+    # Su Shi notes
+    _rule(r'.*(?:Su Shi|Dongpo).*'),
+]
+
+SKIPPED_TITLES = ("No Class", "Midterm", "MTRP")
+
+def parse_header_info(text):
+    """Guess (course name, term) from the first lines of a syllabus."""
+    c_name = None
+    t_name = None
+
+    for line in text.split('\n')[:HEADER_SCAN_LINES]:
+        line = line.strip()
+        if not line: continue
+
+        # Ignore Google Doc/System junk
+        if line.startswith("[") or line.startswith("http") or "Report abuse" in line:
+            continue
+
+        term_match = TERM_RE.search(line)
+        if term_match: t_name = term_match.group(0)
+
+        # Course Name: First substantial line that ISN'T the term
+        if not c_name and len(line) > 5 and not term_match:
+            if "syllabus" in line.lower() and len(line) < 15: continue
+            c_name = line
+
+    return c_name, t_name
+
+def format_date(m, d):
+    """Format a month (number or name) and day as 'Jan 6'."""
+    if str(m).isalpha():
+        for mon in MONTHS:
+            if mon.lower() in m.lower():
+                return f"{mon} {d}"
+        return f"{m} {d}"
+
+    start_m = int(m) if str(m).isdigit() else 1
+    if 1 <= start_m <= 12:
+        return f"{MONTHS[start_m-1]} {d}"
+    return f"{m}/{d}"
+
+def clean_line_text(text):
+    """Strip bibliographic and assignment noise from one title line."""
+    for rule in CLEAN_RULES:
+        if rule is None:
+            text = text.translate(QUOTES)
+        else:
+            text = rule.sub('', text)
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    return text.strip(" ,.-:/")
+
+def assemble_title(parts):
+    """Join cleaned parts with ' / ', dropping any that would pass MAX_TITLE_LENGTH."""
+    cleaned = [p for p in map(clean_line_text, parts) if p]
+    if not cleaned:
+        return ""
+    title = cleaned[0]
+    for part in cleaned[1:]:
+        if len(title) + 3 + len(part) > MAX_TITLE_LENGTH:
+            break
+        title += " / " + part
+    return title
+
+def _keep_title(title):
+    return title and not any(s in title for s in SKIPPED_TITLES) and "final presentation" not in title.lower()
+
+def _match_date(line, current_month):
+    """Return (month, date, remainder) if the line starts a new lesson, else None."""
+    m = SLASH_DATE_RE.match(line) or TEXT_DATE_RE.match(line)
+    if m:
+        month, d = m.groups()
+        return month, format_date(month, d), line[m.end():].strip()
+
+    if current_month:
+        m = BARE_DAY_RE.match(line)
+        if m and int(m.group(1)) <= 31:
+            return current_month, format_date(current_month, m.group(1)), (m.group(2) or "").strip()
+    return None
+
+def parse_syllabus(text):
+    """Parse syllabus text into [{"Plate", "Date", "Title"}, ...]."""
+    lessons = []
+    current_date = None
+    current_month = None
+    title_parts = []
+
+    def flush():
+        title = assemble_title(title_parts)
+        if _keep_title(title):
+            lessons.append({"Plate": len(lessons) + 1, "Date": current_date, "Title": title})
+
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line: continue
+
+        # Skip "Final Presentation" lines entirely
+        if "final presentation" in line.lower(): continue
+
+        match = _match_date(line, current_month)
+        if match:
+            if current_date:
+                flush()
+            current_month, current_date, remainder = match
+            title_parts = [remainder] if remainder else []
+        elif current_date and "WEEK" not in line and "Page" not in line:
+            title_parts.append(line)
+
+    if current_date:
+        flush()
+    return lessons
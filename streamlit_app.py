@@ -1,12 +1,17 @@
 
 import streamlit as st
-import json
-import requests
-import os
-import re
+import hashlib
+import io
+import math
+import threading
 import pandas as pd
 import base64
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import platebook
+import platebook_cache
+import platebook_fetch
+import platebook_syllabus
 import fitz  # PyMuPDF
 from platebook import generate
 
@@ -105,41 +110,31 @@ st.markdown("""
 # Tabs
 tab1, tab2 = st.tabs(["📝 Paste Syllabus (Magic)", "🔗 Google Sheet URL"])
 
-# Helper to save image
-def save_uploaded_image(uploaded_file):
-    if uploaded_file is not None:
-        temp_path = "temp_cover_image.png"
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-        return temp_path
-    return None
+# Helper to generate a PDF entirely in memory
+def generate_pdf_bytes(data, uploaded_cover):
+    cover = io.BytesIO(uploaded_cover.getvalue()) if uploaded_cover is not None else None
+    return platebook_cache.generate_cached(data, cover_image=cover)
 
-# Helper to parse header info
+# Helper to turn the lesson editor table into platebook lessons
+def lessons_from_editor(edited_df):
+    lessons = []
+    for _, row in edited_df.iterrows():
+        lessons.append({
+            "plate_number": int(row["Plate"]),
+            "date": str(row["Date"]),
+            "title": str(row["Title"])
+        })
+    return lessons
+
+# Syllabus parsing is cached on the text, so reruns triggered by other
+# widgets reuse the previous result
+@st.cache_data
 def parse_header_info(text):
-    lines = text.split('\n')
-    c_name = None
-    t_name = None
-    
-    # scan first few lines
-    for i, line in enumerate(lines[:15]): # Scan a bit deeper
-        line = line.strip()
-        if not line: continue
-        
-        # Ignore Google Doc/System junk
-        if line.startswith("[") or line.startswith("http") or "Report abuse" in line:
-            continue
-        
-        # Term Regex (Winter 2026, Fall 2025, etc)
-        term_match = re.search(r'(Fall|Winter|Spring|Summer)\s+\d{4}', line, re.IGNORECASE)
-        if term_match: t_name = term_match.group(0)
-        
-        # Course Name: First substantial line that ISN'T the term
-        if not c_name and len(line) > 5 and not term_match:
-            # If line is "Syllabus" or similar, skip
-            if "syllabus" in line.lower() and len(line) < 15: continue
-            c_name = line
-            
-    return c_name, t_name
+    return platebook_syllabus.parse_header_info(text)
+
+@st.cache_data
+def parse_syllabus(text):
+    return platebook_syllabus.parse_syllabus(text)
 
 # Initialize defaults
 if 'course_name_input' not in st.session_state:
@@ -147,23 +142,112 @@ if 'course_name_input' not in st.session_state:
 if 'term_name_input' not in st.session_state:
     st.session_state.term_name_input = ""
 
+# PDF preview: pages are rasterized on demand, a few at a time, in a
+# shared thread pool and kept in an LRU keyed by (PDF hash, page, width)
+PREVIEW_PAGES_PER_VIEW = 4
+PREVIEW_WORKERS = 4
+PREVIEW_CACHE_PAGES = 64
+PREVIEW_WIDTHS = {"Compact": 600, "Standard": 1000, "Sharp": 1600}  # Pixels
+INLINE_PDF_LIMIT = 1_000_000  # Only offer a data: URL link for small books
+
+def rasterize_page(pdf_data, page_index, width):
+    # Each call opens its own Document; PyMuPDF documents are not thread-safe
+    doc = fitz.open(stream=pdf_data, filetype="pdf")
+    try:
+        page = doc.load_page(page_index)
+        zoom = width / page.rect.width
+        return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+    finally:
+        doc.close()
+
+class PreviewRenderer:
+    """Thread pool plus LRU of rendered preview pages, shared across reruns."""
+
+    def __init__(self, workers=PREVIEW_WORKERS, max_pages=PREVIEW_CACHE_PAGES):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.lock = threading.Lock()
+
+    def render(self, pdf_data, pdf_hash, indexes, width):
+        images = {}
+        with self.lock:
+            for i in indexes:
+                key = (pdf_hash, i, width)
+                if key in self.pages:
+                    self.pages.move_to_end(key)
+                    images[i] = self.pages[key]
+
+        missing = [i for i in indexes if i not in images]
+        futures = {i: self.pool.submit(rasterize_page, pdf_data, i, width) for i in missing}
+        for i, future in futures.items():
+            images[i] = future.result()
+
+        with self.lock:
+            for i in missing:
+                self.pages[(pdf_hash, i, width)] = images[i]
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        return [images[i] for i in indexes]
+
+@st.cache_resource
+def get_preview_renderer():
+    return PreviewRenderer()
+
+@st.cache_data
+def pdf_page_count(pdf_hash, _pdf_data):
+    with fitz.open(stream=_pdf_data, filetype="pdf") as doc:
+        return len(doc)
+
 # Helper to render PDF as images for preview
-def render_pdf_preview(pdf_path, max_pages=5):
+def render_pdf_preview(pdf_data, key):
     try:
-        doc = fitz.open(pdf_path)
-        st.markdown(f"### 📄 Visual Preview (First {min(len(doc), max_pages)} pages)")
-        for page_num in range(min(len(doc), max_pages)):
-            page = doc.load_page(page_num)
-            pix = page.get_pixmap(matrix=fitz.Matrix(2, 2)) # High res
-            img_data = pix.tobytes("png")
-            
-            # Wrap in a container for page styling (shadow/border)
+        pdf_hash = hashlib.sha256(pdf_data).hexdigest()
+        total = pdf_page_count(pdf_hash, pdf_data)
+        views = math.ceil(total / PREVIEW_PAGES_PER_VIEW)
+
+        st.markdown(f"### 📄 Visual Preview ({total} pages)")
+        # A new PDF may be shorter: start its preview at the first pages set
+        view_key = f"{key}_preview_view"
+        if st.session_state.get(f"{key}_preview_hash") != pdf_hash:
+            st.session_state[f"{key}_preview_hash"] = pdf_hash
+            st.session_state[view_key] = 1
+
+        col_view, col_size = st.columns(2)
+        view = col_view.number_input(f"Pages set (of {views})", min_value=1, max_value=views, key=view_key)
+        size = col_size.selectbox("Preview size", list(PREVIEW_WIDTHS), index=1, key=f"{key}_preview_size")
+
+        first = (view - 1) * PREVIEW_PAGES_PER_VIEW
+        indexes = list(range(first, min(first + PREVIEW_PAGES_PER_VIEW, total)))
+        images = get_preview_renderer().render(pdf_data, pdf_hash, indexes, PREVIEW_WIDTHS[size])
+        for page_num, img_data in zip(indexes, images):
             st.image(img_data, caption=f"Page {page_num + 1}", use_container_width=True)
             st.divider()
-        doc.close()
     except Exception as e:
         st.error(f"Could not render preview: {e}")
 
+# Helper to show the download button and preview for the last generated PDF
+def show_pdf_result(key, label, file_name):
+    pdf_data = st.session_state.get(f"{key}_pdf")
+    if pdf_data is None:
+        return
+
+    st.download_button(
+        label=label,
+        data=pdf_data,
+        file_name=file_name,
+        mime="application/pdf",
+        key=f"{key}_download"
+    )
+
+    render_pdf_preview(pdf_data, key)
+
+    # Fallback link (skipped for large books, which would bloat the page)
+    if len(pdf_data) <= INLINE_PDF_LIMIT:
+        base64_pdf = base64.b64encode(pdf_data).decode('utf-8')
+        # Note: Some browsers block data: URLs in new tabs. We provide the download button as the primary action.
+        st.markdown(f"**Tip**: If the preview above is too small, use the Download button or [right-click here to Save As](data:application/pdf;base64,{base64_pdf})")
+
 # --- TAB 1: SYLLABUS PARSER (Render First to capture input) ---
 with tab1:
     st.subheader("1. ✨ Paste Syllabus Text")
@@ -206,207 +290,8 @@ with tab1:
     # --- CONTINUE TAB 1 LOGIC ---
     if syllabus_text:
         st.subheader("2. ✅ Verify & Edit Lessons")
-        # ... parsing logic continues ...
-        
-        # --- PARSING LOGIC ---
-        lines = syllabus_text.split('\n')
-        parsed_data = []
-        current_date_str = None
-        current_title_parts = []
-        plate_count = 1
         
-        # State for smart parsing
-        current_month = None
-        current_year = "2026" # Default from your syllabus, or current year
-        
-        # Regex patterns
-        # 1. "1/5" or "1 / 5" (optionally preceded by day)
-        slash_date = re.compile(r'^(?:[A-Za-z]{2,10}\s*,?\s*)?(\d{1,2})\s*/\s*(\d{1,2})')
-        # 2. "Jan 6" (optionally preceded by day like "Mon, Jan 6")
-        text_date = re.compile(r'^(?:[A-Za-z]{2,10}\s*,?\s*)?(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+(\d{1,2})', re.IGNORECASE)
-        # 3. Just a number "7" (only if we have a current month)
-        bare_day = re.compile(r'^(\d{1,2})$')
-
-        # Helper to format date
-        def format_date(m, d):
-            start_m = int(m) if str(m).isdigit() else 1
-            # Simple mapping if text
-            months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            if str(m).isalpha(): 
-                # try to find index
-                for i, mon in enumerate(months):
-                    if mon.lower() in m.lower():
-                        return f"{mon} {d}"
-                return f"{m} {d}"
-            
-            if 1 <= start_m <= 12:
-                return f"{months[start_m-1]} {d}"
-            return f"{m}/{d}"
-
-        # Helper to clean title noise (Make it SHORT and COGENT)
-        def clean_line_text(text):
-            # Remove "ANTHOLOGY:" prefix
-            text = re.sub(r'^ANTHOLOGY:\s*', '', text, flags=re.IGNORECASE)
-            
-            # Remove parentheses entirely (usually page numbers, dates, translators)
-            # e.g. (pp 3-24), (190-210), (Available as...)
-            text = re.sub(r'\s*\(.*?\)', '', text)
-            
-            # Remove "Dynasty" prefixes
-            text = re.sub(r'\b\w+\s+Dynasty\b', '', text, flags=re.IGNORECASE)
-            
-            # Remove quotes
-            text = text.replace('“', '').replace('”', '').replace('"', '')
-            
-            # Remove "pp." if it appears outside parens
-            text = re.sub(r'pp\.?\s*\d+[-–]\d+', '', text, flags=re.IGNORECASE)
-            
-            # Remove "Vol." or "New York" (Bibliographic info)
-            text = re.sub(r'Vol\.?\s*\d+', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'New York:.*', '', text, flags=re.IGNORECASE)
-            
-            # Remove common Author names (Only if they are at the start or followed by common biblio separators)
-            text = re.sub(r'\b(Ivanhoe|Van Norden|Birch|Turner|Slingerland|Kjellberg|Hutton|Harris)\b[:,\s]*', '', text, flags=re.IGNORECASE)
-            
-            # Remove "Introduction" if it's generic (followed by comma or colon)
-            text = re.sub(r'^Introduction\s*[,:]\s*', '', text, flags=re.IGNORECASE)
-            
-            # Remove assignments/papers
-            text = re.sub(r'PAPER #\d+.*', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'Final paper.*', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'Preliminary Thesis.*', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'.*Due\s*(?:today|on|by).*', '', text, flags=re.IGNORECASE)
-            
-            # Remove file extensions or urls markdown
-            text = re.sub(r'\[.*?\]\s*\(https?://.*?\)', '', text) 
-            
-            # Remove "Week X" if it ended up in the title
-            text = re.sub(r'Week\s+\d+[:\s]*', '', text, flags=re.IGNORECASE)
-            
-            # Remove "Reading:" or "Discussion:" prefix
-            text = re.sub(r'^(?:Readings?|Discussion|Watch|Recommended|Optional|Listen to)[:\s]*', '', text, flags=re.IGNORECASE)
-            
-            # Remove "Blast from the past"
-            text = re.sub(r'Blast from the past.*', '', text, flags=re.IGNORECASE)
-            
-            # Remove "Story of..." (Miss Li, Tsui Ying-Ying, etc)
-            text = re.sub(r'Story of.*', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'The Story of.*', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'Funny story.*', '', text, flags=re.IGNORECASE)
-            
-            # Remove "Selections from..."
-            text = re.sub(r'Selections from.*', '', text, flags=re.IGNORECASE)
-            
-            # Remove Su Shi notes
-            text = re.sub(r'.*Su Shi.*', '', text, flags=re.IGNORECASE)
-            text = re.sub(r'.*Dongpo.*', '', text, flags=re.IGNORECASE)
-            
-            # Clean up extra spaces
-            text = re.sub(r'\s+', ' ', text).strip()
-            return text.strip(" ,.-:/") # added slash to strip
-
-        for line in lines:
-            line = line.strip()
-            if not line: continue
-            
-            # Skip "Final Presentation" lines entirely
-            if "final presentation" in line.lower(): continue
-            
-            is_new_date = False
-            new_date_val = None
-            remainder = ""
-
-            # Check 1: Slash Date (1/5)
-            # ... (regex logic same as before) ...
-            m_slash = slash_date.match(line)
-            if m_slash:
-                m, d = m_slash.groups()
-                current_month = m
-                new_date_val = format_date(m, d)
-                remainder = line[m_slash.end():].strip()
-                is_new_date = True
-            
-            # Check 2: Text Date (Jan 6)
-            elif text_date.match(line):
-                m_text = text_date.match(line)
-                m, d = m_text.groups()
-                current_month = m
-                new_date_val = format_date(m, d)
-                remainder = line[m_text.end():].strip()
-                is_new_date = True
-
-            # Check 3: Bare Day (7)
-            elif current_month:
-                m_bare = re.match(r'^(\d{1,2})\s+(.*)', line)
-                m_bare_solo = re.match(r'^(\d{1,2})$', line)
-                
-                if m_bare:
-                    d = m_bare.group(1)
-                    if int(d) <= 31: 
-                        new_date_val = format_date(current_month, d)
-                        remainder = m_bare.group(2).strip()
-                        is_new_date = True
-                elif m_bare_solo:
-                    d = m_bare_solo.group(1)
-                    if int(d) <= 31:
-                         new_date_val = format_date(current_month, d)
-                         remainder = ""
-                         is_new_date = True
-
-            # PROCESS MATCH
-            if is_new_date:
-                # Save previous lesson
-                if current_date_str:
-                    # Join all parts
-                    cleaned_parts = [clean_line_text(p) for p in current_title_parts]
-                    cleaned_parts = [p for p in cleaned_parts if p] # Remove empty
-                    
-                    # Deduplicate? No, sequence matters.
-                    # Smart Assembly: Fit whole parts into 120 chars
-                    final_title = ""
-                    for i, part in enumerate(cleaned_parts):
-                        if i == 0:
-                            final_title = part
-                        else:
-                            # Check if adding this part keeps us under 120
-                            if len(final_title) + 3 + len(part) <= 120:
-                                final_title += " / " + part
-                            else:
-                                # Start of a new part would limit us?
-                                # If we have space for at least 15 chars, maybe truncate the part?
-                                # User said "Make the tough decision". 
-                                # Decision: Drop subsequent parts if they don't fit.
-                                break 
-                    
-                    if final_title and "No Class" not in final_title and "Midterm" not in final_title and "MTRP" not in final_title and "Final presentation" not in final_title.lower():
-                        parsed_data.append({"Plate": plate_count, "Date": current_date_str, "Title": final_title})
-                        plate_count += 1
-                        
-                current_date_str = new_date_val
-                current_title_parts = [remainder] if remainder else []
-            else:
-                # Not a date -> content line for current lesson
-                if current_date_str:
-                    if "WEEK" not in line and "Page" not in line:
-                         current_title_parts.append(line)
-        
-        # Add last one
-        if current_date_str:
-             cleaned_parts = [clean_line_text(p) for p in current_title_parts]
-             cleaned_parts = [p for p in cleaned_parts if p]
-             # Smart Assembly: Fit whole parts into 120 chars
-             final_title = ""
-             for i, part in enumerate(cleaned_parts):
-                 if i == 0:
-                     final_title = part
-                 else:
-                     if len(final_title) + 3 + len(part) <= 120:
-                         final_title += " / " + part
-                     else:
-                         break
-             
-             if final_title and "No Class" not in final_title and "Midterm" not in final_title and "MTRP" not in final_title and "Final presentation" not in final_title.lower():
-                parsed_data.append({"Plate": plate_count, "Date": current_date_str, "Title": final_title})
+        parsed_data = parse_syllabus(syllabus_text)
 
         # Data Editor
         df = pd.DataFrame(parsed_data) if parsed_data else pd.DataFrame(columns=["Plate", "Date", "Title"])
@@ -423,59 +308,42 @@ with tab1:
 
         st.info(f"Ready to generate **{len(edited_df)} plates**.")
         
-        if st.button("✨ Generate PDF from Syllabus", key="btn_syllabus"):
+        col_generate, col_layout = st.columns(2)
+        generate_clicked = col_generate.button("✨ Generate PDF from Syllabus", key="btn_syllabus")
+        layout_clicked = col_layout.button("👁️ Quick Layout Preview", key="btn_layout_preview")
+
+        if layout_clicked:
+            if edited_df.empty:
+                st.error("No lessons to preview!")
+            else:
+                try:
+                    # Cover, first TOC page and the first plate only - no full book
+                    data = {"course": course_name, "term": term_name, "lessons": lessons_from_editor(edited_df)}
+                    cover = io.BytesIO(cover_image.getvalue()) if cover_image is not None else None
+                    images = platebook.render_preview(data, pages=["cover", "toc", 0], cover_image=cover)
+                    for col, img_data, caption in zip(st.columns(3), images, ["Cover", "Contents", "Plate"]):
+                        col.image(img_data, caption=caption, use_container_width=True)
+                except Exception as e:
+                    st.error(f"Could not render preview: {e}")
+
+        if generate_clicked:
             if edited_df.empty:
                 st.error("No lessons to generate!")
             else:
                 try:
                     with st.spinner("Generating perfect PDF..."):
-                        lessons = []
-                        for _, row in edited_df.iterrows():
-                            lessons.append({
-                                "plate_number": int(row["Plate"]),
-                                "date": str(row["Date"]),
-                                "title": str(row["Title"])
-                            })
-                        
-                        data = {"course": course_name, "term": term_name, "lessons": lessons}
-                        temp_json = "_temp_stream_syl.json"
-                        output_pdf = "platebook.pdf"
-                        
-                        # Save Image
-                        img_path = save_uploaded_image(cover_image)
+                        data = {"course": course_name, "term": term_name, "lessons": lessons_from_editor(edited_df)}
                         
                         # Generate
-                        with open(temp_json, 'w') as f: json.dump(data, f)
-                        platebook.generate(temp_json, output_pdf, cover_image_path=img_path)
-                        
-                        # Download using read()
-                        with open(output_pdf, "rb") as f:
-                            pdf_data = f.read()
-                            
-                        st.download_button(
-                            label="⬇️ Download PDF Platebook",
-                            data=pdf_data,
-                            file_name="Syllabus_Platebook.pdf",
-                            mime="application/pdf"
-                        )
+                        st.session_state.syllabus_pdf = generate_pdf_bytes(data, cover_image)
                         
                         st.balloons()
                         
-                        # Render Preview
-                        render_pdf_preview(output_pdf)
-                        
-                        # Fallback link
-                        base64_pdf = base64.b64encode(pdf_data).decode('utf-8')
-                        # Note: Some browsers block data: URLs in new tabs. We provide the download button as the primary action.
-                        st.markdown(f"**Tip**: If the preview above is too small, use the Download button or [right-click here to Save As](data:application/pdf;base64,{base64_pdf})")
-                        
-                        # Cleanup
-                        if os.path.exists(temp_json): os.remove(temp_json)
-                        if img_path and os.path.exists(img_path): os.remove(img_path)
-                        
                 except Exception as e:
                     st.error(f"Error: {e}")
 
+        show_pdf_result("syllabus", "⬇️ Download PDF Platebook", "Syllabus_Platebook.pdf")
+
 # --- TAB 2: GOOGLE SHEET ---
 with tab2:
     st.subheader("Import from Google Sheet")
@@ -490,53 +358,16 @@ with tab2:
         else:
             try:
                 with st.spinner("Fetching and generating..."):
-                    response = requests.get(sheet_url)
-                    response.raise_for_status()
-                    csv_text = response.text
+                    csv_text = platebook_fetch.fetch_text(sheet_url)
                     
-                    lessons = []
-                    for line in csv_text.strip().split('\n')[1:]:
-                        if not line.strip(): continue
-                        p = line.split(',')
-                        if len(p) >= 3:
-                            lessons.append({
-                                "plate_number": int(p[0].strip()),
-                                "date": p[1].strip().replace('"', ''),
-                                "title": p[2].strip().replace('"', '')
-                            })
+                    lessons = list(platebook.parse_csv_text(csv_text))
                     
                     data = {"course": course_name, "term": term_name, "lessons": lessons}
-                    temp_json = "_temp_sheet.json"
-                    output_pdf = "platebook_sheet.pdf"
-                    
-                    # Save Image
-                    img_path = save_uploaded_image(cover_image)
                     
                     # Generate
-                    with open(temp_json, 'w') as f: json.dump(data, f)
-                    platebook.generate(temp_json, output_pdf, cover_image_path=img_path)
-                    
-                    # Download using read()
-                    with open(output_pdf, "rb") as f:
-                        pdf_data = f.read()
-                        
-                    st.download_button(
-                        label="⬇️ Download PDF",
-                        data=pdf_data,
-                        file_name="GoogleSheet_Platebook.pdf",
-                        mime="application/pdf"
-                    )
-                    
-                    # Render Preview
-                    render_pdf_preview(output_pdf)
-                    
-                    # Fallback link
-                    base64_pdf = base64.b64encode(pdf_data).decode('utf-8')
-                    # Note: Some browsers block data: URLs in new tabs. We provide the download button as the primary action.
-                    st.markdown(f"**Tip**: If the preview above is too small, use the Download button or [right-click here to Save As](data:application/pdf;base64,{base64_pdf})")
-                    
-                    if os.path.exists(temp_json): os.remove(temp_json)
-                    if img_path and os.path.exists(img_path): os.remove(img_path)
+                    st.session_state.sheet_pdf = generate_pdf_bytes(data, cover_image)
 
             except Exception as e:
                 st.error(f"Error: {e}")
+
+    show_pdf_result("sheet", "⬇️ Download PDF", "GoogleSheet_Platebook.pdf")
@@ -17,11 +17,20 @@ import json
 import argparse
 import os
 import math
+import re
 import hashlib
+import multiprocessing
+import subprocess
+import tempfile
+import threading
 import numpy as np
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from array import array
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from io import BytesIO
+from urllib.parse import urlparse
 
 import matplotlib
 matplotlib.use("Agg")
@@ -38,6 +47,7 @@ except ImportError:
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
 except ImportError:
     print("Missing requests. Run: pip install requests")
     exit(1)
@@ -52,6 +62,48 @@ TILE_URL = "https://a.basemaps.cartocdn.com/light_all/{z}/{x}/{y}.png"
 
 CACHE_DIR = Path(".tile_cache")
 TILE_SIZE = 256
+MAX_TILES = 100  # Per stitched map; zoom out until the view fits
+TILE_TIMEOUT = 10
+TILE_WORKERS = 16  # Tiles fetched/decoded in parallel
+TILE_HOST_CONCURRENCY = 4  # Simultaneous requests per tile server
+TILE_CACHE_SIZE = 256  # Decoded tiles kept in memory (~50 MB)
+MAP_CACHE_SIZE = 8  # Stitched maps kept in memory
+
+# One pooled session and worker pool shared by all tile fetches
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_maxsize=TILE_WORKERS))
+_session.mount("https://", HTTPAdapter(pool_maxsize=TILE_WORKERS))
+_session.headers["User-Agent"] = "TravelVisualizer/1.0"
+_tile_pool = ThreadPoolExecutor(max_workers=TILE_WORKERS)
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+BLANK_TILE = Image.new('RGB', (TILE_SIZE, TILE_SIZE), (240, 240, 240))
+
+class LRUCache:
+    """Small thread-safe LRU mapping."""
+
+    def __init__(self, max_items):
+        self.max_items = max_items
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.items:
+                return None
+            self.items.move_to_end(key)
+            return self.items[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.max_items:
+                self.items.popitem(last=False)
+
+_tile_cache = LRUCache(TILE_CACHE_SIZE)  # (url template, z, x, y) -> Image
+_map_cache = LRUCache(MAP_CACHE_SIZE)  # (url template, z, x range, y range) -> (Image, extent)
 
 # ------------------------------------------------------------
 # Tile Functions
@@ -73,28 +125,71 @@ def num2deg(xtile, ytile, zoom):
     lat_deg = math.degrees(lat_rad)
     return lat_deg, lon_deg
 
+def host_limit(url):
+    """Semaphore capping concurrent requests to the host serving url."""
+    host = urlparse(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(TILE_HOST_CONCURRENCY)
+        return _host_limits[host]
+
+def tile_cache_path(x, y, z):
+    """Disk cache file for a tile, keyed by the tile style (TILE_URL)."""
+    style = hashlib.sha256(TILE_URL.encode("utf-8")).hexdigest()[:8]
+    return CACHE_DIR / f"{style}_{z}_{x}_{y}.png"
+
 def get_tile(x, y, z):
-    """Fetch a tile, using cache if available."""
+    """Fetch a tile, using the memory and disk caches if available.
+
+    Returns BLANK_TILE (uncached) if the tile cannot be fetched.
+    """
+    key = (TILE_URL, z, x, y)
+    img = _tile_cache.get(key)
+    if img is not None:
+        return img
+
     CACHE_DIR.mkdir(exist_ok=True)
-    cache_file = CACHE_DIR / f"{z}_{x}_{y}.png"
+    cache_file = tile_cache_path(x, y, z)
     
     if cache_file.exists():
-        return Image.open(cache_file)
+        img = Image.open(cache_file)
+        img.load()
+        _tile_cache.put(key, img)
+        return img
     
     url = TILE_URL.format(z=z, x=x, y=y)
     try:
-        headers = {'User-Agent': 'TravelVisualizer/1.0'}
-        response = requests.get(url, headers=headers, timeout=10)
+        with host_limit(url):
+            response = _session.get(url, timeout=TILE_TIMEOUT)
         response.raise_for_status()
         img = Image.open(BytesIO(response.content))
-        img.save(cache_file)
+        # Write atomically: parallel renders may fetch the same tile
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".png")
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, format="PNG")
+        os.replace(tmp, cache_file)
+        _tile_cache.put(key, img)
         return img
     except Exception as e:
         print(f"Tile fetch error: {e}")
-        return Image.new('RGB', (TILE_SIZE, TILE_SIZE), (240, 240, 240))
+        return BLANK_TILE
 
-def get_map_for_bounds(min_lon, max_lon, min_lat, max_lat, width_px=1600):
-    """Get a stitched map image for the given bounds."""
+def get_tiles(coords, z):
+    """Fetch many tiles concurrently. Returns {(x, y): Image}."""
+    futures = {(x, y): _tile_pool.submit(get_tile, x, y, z) for x, y in coords}
+    return {xy: future.result() for xy, future in futures.items()}
+
+def tile_range(min_lon, max_lon, min_lat, max_lat, zoom):
+    """Clamped (x_min, x_max, y_min, y_max) tile range covering the bounds."""
+    x_min, y_max = deg2num(min_lat, min_lon, zoom)
+    x_max, y_min = deg2num(max_lat, max_lon, zoom)
+    
+    # Clamp to valid range
+    n = 2 ** zoom
+    return max(0, x_min), min(n - 1, x_max), max(0, y_min), min(n - 1, y_max)
+
+def map_tiles(min_lon, max_lon, min_lat, max_lat, width_px=1600):
+    """Zoom and tile range (zoom, x_min, x_max, y_min, y_max) for a view."""
     # Calculate appropriate zoom level
     lon_span = max_lon - min_lon
     # Approximate: at zoom z, each tile covers 360/2^z degrees
@@ -102,43 +197,54 @@ def get_map_for_bounds(min_lon, max_lon, min_lat, max_lat, width_px=1600):
     target_zoom = int(math.log2(360.0 / lon_span * width_px / TILE_SIZE))
     zoom = max(2, min(18, target_zoom))
     
-    # Get tile range
-    x_min, y_max = deg2num(min_lat, min_lon, zoom)
-    x_max, y_min = deg2num(max_lat, max_lon, zoom)
+    # Get tile range, zooming out to limit tiles and prevent huge downloads
+    x_min, x_max, y_min, y_max = tile_range(min_lon, max_lon, min_lat, max_lat, zoom)
+    while (x_max - x_min + 1) * (y_max - y_min + 1) > MAX_TILES and zoom > 0:
+        zoom -= 1
+        x_min, x_max, y_min, y_max = tile_range(min_lon, max_lon, min_lat, max_lat, zoom)
+    return zoom, x_min, x_max, y_min, y_max
+
+def has_tiles(tiles):
+    _, x_min, x_max, y_min, y_max = tiles
+    return x_max >= x_min and y_max >= y_min
+
+def get_map_for_bounds(min_lon, max_lon, min_lat, max_lat, width_px=1600):
+    """Get a stitched map image for the given bounds."""
+    tiles = map_tiles(min_lon, max_lon, min_lat, max_lat, width_px)
+    if not has_tiles(tiles):  # e.g. a view wrapping past the antimeridian
+        raise ValueError(f"No tiles cover the view {min_lon:.1f}..{max_lon:.1f}")
+    zoom, x_min, x_max, y_min, y_max = tiles
     
-    # Clamp to valid range
-    n = 2 ** zoom
-    x_min = max(0, x_min)
-    x_max = min(n - 1, x_max)
-    y_min = max(0, y_min)
-    y_max = min(n - 1, y_max)
+    # Nearby views share a tile set; reuse the stitched map for them
+    key = (TILE_URL, zoom, x_min, x_max, y_min, y_max)
+    cached = _map_cache.get(key)
+    if cached is not None:
+        return cached
     
     # Calculate image size
     num_x = x_max - x_min + 1
     num_y = y_max - y_min + 1
     
-    # Limit tiles to prevent huge downloads
-    if num_x * num_y > 100:
-        zoom -= 1
-        return get_map_for_bounds(min_lon, max_lon, min_lat, max_lat, width_px)
-    
     # Stitch tiles
     img_width = num_x * TILE_SIZE
     img_height = num_y * TILE_SIZE
     result = Image.new('RGB', (img_width, img_height))
     
-    for x in range(x_min, x_max + 1):
-        for y in range(y_min, y_max + 1):
-            tile = get_tile(x, y, zoom)
-            px = (x - x_min) * TILE_SIZE
-            py = (y - y_min) * TILE_SIZE
-            result.paste(tile, (px, py))
+    coords = [(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+    complete = True
+    for (x, y), tile in get_tiles(coords, zoom).items():
+        px = (x - x_min) * TILE_SIZE
+        py = (y - y_min) * TILE_SIZE
+        result.paste(tile, (px, py))
+        complete = complete and tile is not BLANK_TILE
     
     # Calculate actual bounds of stitched image
     nw_lat, nw_lon = num2deg(x_min, y_min, zoom)
     se_lat, se_lon = num2deg(x_max + 1, y_max + 1, zoom)
     
     extent = (nw_lon, se_lon, se_lat, nw_lat)
+    if complete:  # Retry missing tiles next time
+        _map_cache.put(key, (result, extent))
     return result, extent
 
 # ------------------------------------------------------------
@@ -146,43 +252,92 @@ def get_map_for_bounds(min_lon, max_lon, min_lat, max_lat, width_px=1600):
 # ------------------------------------------------------------
 
 def slerp(p0, p1, t):
-    """Spherical Linear Interpolation between two points."""
-    if np.allclose(p0, p1):
-        return p0
+    """Spherical Linear Interpolation between two points.
 
-    lon0, lat0 = np.radians(p0)
-    lon1, lat1 = np.radians(p1)
+    p0, p1 are (lon, lat) in degrees; each coordinate and t may be arrays,
+    in which case every element is interpolated independently.
+    """
+    lon0, lat0 = np.radians(p0[0]), np.radians(p0[1])
+    lon1, lat1 = np.radians(p1[0]), np.radians(p1[1])
 
-    v0 = np.array([
+    v0 = np.stack([
         np.cos(lat0) * np.cos(lon0),
         np.cos(lat0) * np.sin(lon0),
         np.sin(lat0)
     ])
-    v1 = np.array([
+    v1 = np.stack([
         np.cos(lat1) * np.cos(lon1),
         np.cos(lat1) * np.sin(lon1),
         np.sin(lat1)
     ])
 
-    dot = np.clip(np.dot(v0, v1), -1.0, 1.0)
+    dot = np.clip(np.sum(v0 * v1, axis=0), -1.0, 1.0)
     omega = np.arccos(dot)
 
-    if omega < 1e-6:
-        return p0
+    # Coincident points stay at p0
+    same = (np.isclose(p0[0], p1[0]) & np.isclose(p0[1], p1[1])) | (omega < 1e-6)
 
-    sin_omega = np.sin(omega)
-    v_interp = (np.sin((1.0 - t) * omega) / sin_omega) * v0 + \
-               (np.sin(t * omega) / sin_omega) * v1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sin_omega = np.sin(omega)
+        v_interp = (np.sin((1.0 - t) * omega) / sin_omega) * v0 + \
+                   (np.sin(t * omega) / sin_omega) * v1
 
     lat_interp = np.arcsin(v_interp[2])
     lon_interp = np.arctan2(v_interp[1], v_interp[0])
 
-    return np.degrees(lon_interp), np.degrees(lat_interp)
+    lon = np.where(same, p0[0], np.degrees(lon_interp))
+    lat = np.where(same, p0[1], np.degrees(lat_interp))
+    return lon, lat
 
 # ------------------------------------------------------------
 # Data Processing
 # ------------------------------------------------------------
 
+SEGMENT_CHUNK_SIZE = 1 << 20  # Characters read at a time from an export
+DEDUP_SECONDS = 10  # Repeated positions closer than this are dropped
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_array_skip = re.compile(r'[\s,]*')
+
+def iter_segments(f, chunk_size=SEGMENT_CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array one at a time.
+
+    Only one chunk and the segment being decoded are held in memory.
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array of timeline segments")
+    pos = 1
+    while True:
+        pos = _array_skip.match(buf, pos).end()
+        if buf.startswith("]", pos):
+            return
+        try:
+            seg, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            more = f.read(chunk_size)
+            if not more:
+                raise
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        yield seg
+        pos = end
+
+def parse_time(s):
+    """Parse an ISO-8601 timestamp (fast path, dateutil fallback)."""
+    try:
+        return datetime.fromisoformat(s[:-1] + "+00:00" if s.endswith("Z") else s)
+    except ValueError:
+        return dateutil.parser.parse(s)
+
+def epoch_ms(t):
+    """Milliseconds since the epoch; naive times are taken as UTC."""
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return (t - EPOCH) // timedelta(milliseconds=1)
+
 def parse_geo(s):
     if not s or not s.startswith("geo:"):
         return None
@@ -192,23 +347,54 @@ def parse_geo(s):
     except:
         return None
 
-def extract_raw_points(data, target_year=2025):
-    pts = []
-    for seg in data:
+class TimelinePoints:
+    """Time-sorted points as columns: epoch ms (int64), lon/lat (float32)
+    and the UTC offset in seconds (int32) of the segment each came from."""
+
+    def __init__(self, times, lons, lats, utc_offsets):
+        self.times = times
+        self.lons = lons
+        self.lats = lats
+        self.utc_offsets = utc_offsets
+
+    def __len__(self):
+        return len(self.times)
+
+    def datetime_at(self, i):
+        """Point i's time as an aware datetime in its own UTC offset."""
+        tz = timezone(timedelta(seconds=int(self.utc_offsets[i])))
+        return (EPOCH + timedelta(milliseconds=int(self.times[i]))).astimezone(tz)
+
+def extract_raw_points(segments, target_year=2025):
+    """Collect points from timeline segments (any iterable, e.g. iter_segments)."""
+    times = array("q")
+    lons = array("f")
+    lats = array("f")
+    offsets = array("i")
+
+    def add(t, lon, lat):
+        times.append(t)
+        lons.append(lon)
+        lats.append(lat)
+        offsets.append(utc_offset)
+
+    for seg in segments:
         t0_str = seg.get("startTime")
         if not t0_str: continue
-        t0 = dateutil.parser.parse(t0_str)
+        t0 = parse_time(t0_str)
         if t0.year != target_year: continue
         
         t1_str = seg.get("endTime")
-        t1 = dateutil.parser.parse(t1_str) if t1_str else t0
+        t1 = parse_time(t1_str) if t1_str else t0
+        t0_ms, t1_ms = epoch_ms(t0), epoch_ms(t1)
+        utc_offset = int(t0.utcoffset().total_seconds()) if t0.tzinfo else 0
 
         # 1. visit
         visit = seg.get("visit", {})
         loc = visit.get("topCandidate", {}).get("placeLocation")
         p = parse_geo(loc)
         if p:
-            pts.append({"time": t0, "lon": p[1], "lat": p[0]})
+            add(t0_ms, p[1], p[0])
 
         # 2. activity
         activity = seg.get("activity", {})
@@ -218,143 +404,232 @@ def extract_raw_points(data, target_year=2025):
         path_pts = activity.get("simplifiedRawPath", {}).get("points", [])
         if path_pts:
             num_pts = len(path_pts)
-            total_delta = (t1 - t0).total_seconds()
+            total_delta = t1_ms - t0_ms
             for i, pth in enumerate(path_pts):
-                lat = pth.get("latE7") / 1e7
-                lon = pth.get("lngE7") / 1e7
-                offset = total_delta * ((i + 1) / (num_pts + 1))
-                pt_time = t0 + timedelta(seconds=offset)
-                pts.append({"time": pt_time, "lon": lon, "lat": lat})
+                offset = round(total_delta * ((i + 1) / (num_pts + 1)))
+                add(t0_ms + offset, pth.get("lngE7") / 1e7, pth.get("latE7") / 1e7)
         
         if p_start:
-            pts.append({"time": t0, "lon": p_start[1], "lat": p_start[0]})
+            add(t0_ms, p_start[1], p_start[0])
         if p_end:
-            pts.append({"time": t1, "lon": p_end[1], "lat": p_end[0]})
+            add(t1_ms, p_end[1], p_end[0])
 
         # 3. timelinePath
         for pth in seg.get("timelinePath", []):
             p = parse_geo(pth.get("point"))
             if p:
                 offset = int(pth.get("durationMinutesOffsetFromStartTime", 0))
-                pt_time = t0 + timedelta(minutes=offset)
-                pts.append({"time": pt_time, "lon": p[1], "lat": p[0]})
-
-    pts.sort(key=lambda x: x["time"])
-    
-    # Deduplicate
-    clean = []
-    if not pts: return clean
+                add(t0_ms + offset * 60000, p[1], p[0])
+
+    t = np.frombuffer(times, dtype=np.int64)
+    order = np.argsort(t, kind="stable")
+    t = t[order]
+    lon = np.frombuffer(lons, dtype=np.float32)[order]
+    lat = np.frombuffer(lats, dtype=np.float32)[order]
+    off = np.frombuffer(offsets, dtype=np.int32)[order]
     
-    clean.append(pts[0])
-    for i in range(1, len(pts)):
-        p_prev = clean[-1]
-        p_curr = pts[i]
-        if p_curr["lon"] == p_prev["lon"] and p_curr["lat"] == p_prev["lat"] and \
-           (p_curr["time"] - p_prev["time"]).total_seconds() < 10:
-            continue
-        clean.append(p_curr)
+    # Deduplicate: drop a point at the same position as the last kept one
+    # within DEDUP_SECONDS. Only repeats of the previous point can qualify;
+    # walk back to the last kept point for those few candidates.
+    keep = np.ones(len(t), dtype=bool)
+    window = DEDUP_SECONDS * 1000
+    candidates = np.flatnonzero((lon[1:] == lon[:-1]) & (lat[1:] == lat[:-1]) &
+                                (np.diff(t) < window)) + 1
+    for i in candidates:
+        j = i - 1
+        while not keep[j]:
+            j -= 1
+        if t[i] - t[j] < window:
+            keep[i] = False
     
-    return clean
+    return TimelinePoints(t[keep], lon[keep], lat[keep], off[keep])
 
 # ------------------------------------------------------------
 # Pacing & Interpolation
 # ------------------------------------------------------------
 
 def prepare_animation_data(pts, total_frames):
-    if not pts: return [], [], []
+    if not len(pts): return [], [], []
 
-    real_times = np.array([(p["time"] - pts[0]["time"]).total_seconds() for p in pts])
+    real_times = (pts.times - pts.times[0]) / 1000.0
+    pt_lons = pts.lons.astype(float)
+    pt_lats = pts.lats.astype(float)
     
-    perceived_duration = [0]
-    for i in range(1, len(pts)):
-        p0 = (pts[i-1]["lon"], pts[i-1]["lat"])
-        p1 = (pts[i]["lon"], pts[i]["lat"])
-        dist = np.sqrt((p1[0]-p0[0])**2 + (p1[1]-p0[1])**2)
-        move_weight = dist * 3.5
-        time_weight = min((real_times[i] - real_times[i-1]) / 3600.0, 3.0)
-        segment_weight = max(0.3, move_weight + time_weight)
-        perceived_duration.append(perceived_duration[-1] + segment_weight)
-
-    perceived_duration = np.array(perceived_duration)
+    # Perceived duration: movement plus (capped) dwell time, at least 0.3 per segment
+    dist = np.hypot(np.diff(pt_lons), np.diff(pt_lats))
+    move_weight = dist * 3.5
+    time_weight = np.minimum(np.diff(real_times) / 3600.0, 3.0)
+    segment_weight = np.maximum(0.3, move_weight + time_weight)
+    perceived_duration = np.concatenate(([0.0], np.cumsum(segment_weight)))
     total_weight = perceived_duration[-1]
     
     frame_weights = np.linspace(0, total_weight, total_frames)
     
-    path_lons = []
-    path_lats = []
-    frame_display_times = []
-
-    for fw in frame_weights:
-        idx = np.searchsorted(perceived_duration, fw)
-        if idx == 0:
-            p = (pts[0]["lon"], pts[0]["lat"])
-            dt = pts[0]["time"]
-        elif idx >= len(pts):
-            p = (pts[-1]["lon"], pts[-1]["lat"])
-            dt = pts[-1]["time"]
-        else:
-            w0, w1 = perceived_duration[idx-1], perceived_duration[idx]
-            weight = (fw - w0) / (w1 - w0)
-            p0 = (pts[idx-1]["lon"], pts[idx-1]["lat"])
-            p1 = (pts[idx]["lon"], pts[idx]["lat"])
-            
-            dist = np.sqrt((p1[0]-p0[0])**2 + (p1[1]-p0[1])**2)
-            if dist > 1.0:
-                p = slerp(p0, p1, weight)
-            else:
-                lon = p0[0] + (p1[0] - p0[0]) * weight
-                lat = p0[1] + (p1[1] - p0[1]) * weight
-                p = (lon, lat)
-            
-            t0, t1 = real_times[idx-1], real_times[idx]
-            rt = t0 + (t1 - t0) * weight
-            dt = pts[0]["time"] + timedelta(seconds=rt)
+    # Segment (idx-1, idx) containing each frame; clamp to the path ends
+    idx = np.searchsorted(perceived_duration, frame_weights)
+    before_start = idx == 0
+    past_end = idx >= len(pts)
+    i1 = np.clip(idx, 1, len(pts) - 1)
+    i0 = i1 - 1
+    
+    w0, w1 = perceived_duration[i0], perceived_duration[i1]
+    with np.errstate(divide="ignore", invalid="ignore"):  # Single-point paths
+        weight = (frame_weights - w0) / (w1 - w0)
+    weight = np.where(before_start, 0.0, np.where(past_end, 1.0, weight))
+    
+    lon0, lat0 = pt_lons[i0], pt_lats[i0]
+    lon1, lat1 = pt_lons[i1], pt_lats[i1]
+    
+    # Long hops follow the great circle, short ones are linear
+    far = np.hypot(lon1 - lon0, lat1 - lat0) > 1.0
+    path_lons = lon0 + (lon1 - lon0) * weight
+    path_lats = lat0 + (lat1 - lat0) * weight
+    if far.any():
+        slerp_lons, slerp_lats = slerp((lon0[far], lat0[far]), (lon1[far], lat1[far]), weight[far])
+        path_lons[far] = slerp_lons
+        path_lats[far] = slerp_lats
+    
+    rt = real_times[i0] + (real_times[i1] - real_times[i0]) * weight
+    
+    # Exact endpoints where the frame falls outside the path
+    path_lons = np.where(before_start, pt_lons[0], np.where(past_end, pt_lons[-1], path_lons))
+    path_lats = np.where(before_start, pt_lats[0], np.where(past_end, pt_lats[-1], path_lats))
+    start_time = pts.datetime_at(0)
+    frame_display_times = [start_time + timedelta(seconds=s) for s in rt.tolist()]
+    for f in np.flatnonzero(before_start):
+        frame_display_times[f] = start_time
+    for f in np.flatnonzero(past_end):
+        frame_display_times[f] = pts.datetime_at(len(pts) - 1)
+
+    return path_lons, path_lats, frame_display_times
 
-        path_lons.append(p[0])
-        path_lats.append(p[1])
-        frame_display_times.append(dt)
+# ------------------------------------------------------------
+# Camera
+# ------------------------------------------------------------
 
-    return np.array(path_lons), np.array(path_lats), frame_display_times
+ASPECT = 16/9
+CAMERA_LERP = 0.02  # Low lerp slows camera transitions and allows longer dwell
+MAP_REFRESH_FRAMES = 10  # Refetch the map at least this often
+TRAVEL_WIDTH = 180.0  # Camera width outside every region
+
+# Regions with fixed camera positions; the first match wins.
+# Higher width = more zoomed out. Override with --regions regions.json.
+REGIONS = [
+    {"name": "Wisconsin", "lon": [-93, -85], "lat": [42, 47], "center": [-89.0, 44.2], "width": 8.0},
+    # Smaller width for a tighter zoom
+    {"name": "Korea", "lon": [124, 130], "lat": [33, 39], "center": [127.0, 36.0], "width": 4.0},
+]
+
+def load_regions(path):
+    """Read a JSON list of regions shaped like REGIONS."""
+    with open(path, "r", encoding="utf-8") as f:
+        regions = json.load(f)
+    for region in regions:
+        missing = {"lon", "lat", "center", "width"} - set(region)
+        if missing:
+            raise ValueError(f"Region {region.get('name', '?')} is missing {', '.join(sorted(missing))}")
+    return regions
+
+def camera_targets(lons, lats, regions=REGIONS):
+    """Per-frame camera target (lon, lat, width): a region's fixed view, or
+    the current point at TRAVEL_WIDTH outside every region."""
+    target_lon = np.array(lons, dtype=float)
+    target_lat = np.array(lats, dtype=float)
+    target_w = np.full(len(lons), TRAVEL_WIDTH)
+    # Apply in reverse so earlier regions take precedence
+    for region in reversed(regions):
+        inside = ((region["lon"][0] < lons) & (lons < region["lon"][1]) &
+                  (region["lat"][0] < lats) & (lats < region["lat"][1]))
+        target_lon[inside] = region["center"][0]
+        target_lat[inside] = region["center"][1]
+        target_w[inside] = region["width"]
+    return target_lon, target_lat, target_w
+
+def map_bounds_key(xlim, ylim):
+    """Rounded view bounds; the map is refetched when these change."""
+    return (round(xlim[0], 1), round(xlim[1], 1), 
+            round(ylim[0], 1), round(ylim[1], 1))
+
+class CameraPath:
+    """Precomputed camera: center and width for every frame, plus the
+    (min_lon, max_lon, min_lat, max_lat) of the map shown on each frame
+    (NaN until the first successful fetch). Any frame can be drawn on its
+    own from these arrays."""
+
+    def __init__(self, center_lon, center_lat, width, map_bounds):
+        self.center_lon = center_lon
+        self.center_lat = center_lat
+        self.width = width
+        self.map_bounds = map_bounds
+
+    def limits(self, i):
+        """(xlim, ylim) for frame i."""
+        clon, clat, w = self.center_lon[i], self.center_lat[i], self.width[i]
+        return (clon - w/2, clon + w/2), (clat - (w/ASPECT)/2, clat + (w/ASPECT)/2)
+
+def camera_path(lons, lats, regions=REGIONS):
+    """Ease the camera toward each frame's target, starting on the first."""
+    target_lon, target_lat, target_w = camera_targets(lons, lats, regions)
+    n = len(lons)
+    center_lon, center_lat, width = np.empty(n), np.empty(n), np.empty(n)
+
+    # The lerp depends on the previous frame, so this stays a (cheap) loop
+    clon, clat, cw = target_lon[0], target_lat[0], target_w[0]
+    for i, (tlon, tlat, tw) in enumerate(zip(target_lon.tolist(), target_lat.tolist(), target_w.tolist())):
+        if abs(tlon - clon) > 180:
+            clon += 360 if tlon > clon else -360
+        cw += (tw - cw) * CAMERA_LERP
+        clon += (tlon - clon) * CAMERA_LERP
+        clat += (tlat - clat) * CAMERA_LERP
+        center_lon[i], center_lat[i], width[i] = clon, clat, cw
+
+    camera = CameraPath(center_lon, center_lat, width, np.full((n, 4), np.nan))
+
+    # Refresh the map every MAP_REFRESH_FRAMES frames or when the rounded view
+    # changes; views without tiles keep the previous map
+    last_bounds = None
+    shown = (np.nan,) * 4
+    for i in range(n):
+        xlim, ylim = camera.limits(i)
+        current_bounds = map_bounds_key(xlim, ylim)
+        if i % MAP_REFRESH_FRAMES == 0 or last_bounds != current_bounds:
+            bounds = (xlim[0], xlim[1], ylim[0], ylim[1])
+            if has_tiles(map_tiles(*bounds)):
+                shown = bounds
+                last_bounds = current_bounds
+        camera.map_bounds[i] = shown
+    return camera
+
+def prefetch_tiles(camera):
+    """Download every tile the video will show, concurrently, before rendering."""
+    views = {tuple(row) for row in camera.map_bounds.tolist() if not math.isnan(row[0])}
+    needed = set()
+    for view in views:
+        zoom, x_min, x_max, y_min, y_max = map_tiles(*view)
+        needed.update((zoom, x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1))
+    missing = [t for t in needed if not tile_cache_path(t[1], t[2], t[0]).exists()]
+    print(f"Map uses {len(needed)} tiles across {len(views)} views; fetching {len(missing)}...")
+    futures = [_tile_pool.submit(get_tile, x, y, z) for z, x, y in missing]
+    for future in futures:
+        future.result()
 
 # ------------------------------------------------------------
 # Main Visualization
 # ------------------------------------------------------------
 
-def main():
-    ap = argparse.ArgumentParser()
-    ap.add_argument("--input", default="new2025.json")
-    ap.add_argument("--output", default="trip_2025.mp4")
-    ap.add_argument("--fps", type=int, default=30)
-    ap.add_argument("--year", type=int, default=2025)
-    ap.add_argument("--duration", type=int, default=50)
-    ap.add_argument("--dark", action="store_true", help="Use dark map tiles")
-    args = ap.parse_args()
-
-    # Set tile URL based on theme
-    global TILE_URL
-    if args.dark:
-        TILE_URL = "https://a.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}.png"
+def build_scene(lons, lats, times, camera):
+    """Create the figure and per-frame update function.
 
-    print("Loading data...")
-    with open(args.input, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    raw_pts = extract_raw_points(data, target_year=args.year)
-    if len(raw_pts) < 2:
-        print("Not enough points found.")
-        return
-
-    total_frames = args.fps * args.duration
-    lons, lats, times = prepare_animation_data(raw_pts, total_frames)
-
-    print("Setting up plot...")
+    Every frame's view comes from the precomputed camera, so frames can be
+    drawn in any order and chunks can render separately.
+    """
+    total_frames = len(lons)
     fig, ax = plt.subplots(figsize=(16, 9), dpi=100)
     ax.axis("off")
     fig.subplots_adjust(left=0, right=1, bottom=0, top=1)
 
-    # Initial map (Wisconsin)
-    init_img, init_extent = get_map_for_bounds(-93, -85, 42, 47)
-    map_layer = ax.imshow(init_img, extent=init_extent, aspect='auto', zorder=0)
+    # Map image; filled in by the first update
+    map_layer = ax.imshow(BLANK_TILE, extent=(-180, 180, -85, 85), aspect='auto', zorder=0)
 
     # City labels
     cities = [
@@ -390,95 +665,186 @@ def main():
                         fontsize=36, fontweight='bold', ha='center',
                         bbox=dict(facecolor='black', alpha=0.7, edgecolor='none', boxstyle='round,pad=0.6'))
 
-    # Initial view
-    zoom_center = (-89.0, 44.2)
-    zoom_width = 8.0
-    ax.set_xlim(zoom_center[0] - zoom_width/2, zoom_center[0] + zoom_width/2)
-    ax.set_ylim(zoom_center[1] - (zoom_width*9/16)/2, zoom_center[1] + (zoom_width*9/16)/2)
+    # Dateline-split path, built once: a NaN before every jump > 180 breaks
+    # the line. Frame i shows the prefix ending at point i.
+    jumps = np.flatnonzero(np.abs(np.diff(lons)) > 180) + 1
+    path_x = np.insert(lons, jumps, np.nan)
+    path_y = np.insert(lats, jumps, np.nan)
+    frame_idx = np.arange(total_frames)
+    path_end = frame_idx + 1 + np.searchsorted(jumps, frame_idx, side="right")
 
-    # Track last map bounds to avoid re-fetching
-    last_bounds = None
+    # Track the map shown to avoid re-fetching and redundant redraws
+    shown_bounds = None
+    last_img = None
 
     def update(i):
-        nonlocal last_bounds
+        nonlocal shown_bounds, last_img
         
         if i % 50 == 0:
             print(f"Frame {i}/{total_frames}...")
             
-        k = i + 1
-        x, y = lons[:k], lats[:k]
-        
-        # Mask jumps > 180 (Dateline crossing)
-        diffs = np.abs(np.diff(x))
-        mask = diffs > 180
-        mx, my = np.array(x), np.array(y)
-        if len(mask) > 0:
-            indices = np.where(mask)[0] + 1
-            mx = np.insert(mx, indices, np.nan)
-            my = np.insert(my, indices, np.nan)
-
-        main_line.set_data(mx, my)
-        glow_line.set_data(mx, my)
+        k = path_end[i]
+        main_line.set_data(path_x[:k], path_y[:k])
+        glow_line.set_data(path_x[:k], path_y[:k])
         dot.set_data([lons[i]], [lats[i]])
         date_text.set_text(times[i].strftime("%B %d, %Y"))
 
-        # Region-based stable camera
-        curr_lon, curr_lat = lons[i], lats[i]
-        
-        # Define regions with fixed camera positions
-        if -93 < curr_lon < -85 and 42 < curr_lat < 47:
-            # Wisconsin region: center and width (higher width = more zoomed out)
-            target_lon, target_lat, target_w = -89.0, 44.2, 8.0
-        elif 124 < curr_lon < 130 and 33 < curr_lat < 39:
-            # Korea region: set a smaller width for a tighter zoom
-            target_lon, target_lat, target_w = 127.0, 36.0, 4.0
-        else:
-            target_lon, target_lat, target_w = curr_lon, curr_lat, 180.0
-        
-        # Removed cross-region lookahead trigger to allow camera to stay zoomed in until actually leaving the region
-        
-        xlim, ylim = ax.get_xlim(), ax.get_ylim()
-        cw, clon, clat = (xlim[1]-xlim[0]), (xlim[0]+xlim[1])/2, (ylim[0]+ylim[1])/2
-        
-        if abs(target_lon - clon) > 180:
-            clon += 360 if target_lon > clon else -360
-
-        # Reduce lerp to slow down camera transitions and allow longer dwell
-        lerp = 0.02
-        nw = cw + (target_w - cw) * lerp
-        nclon = clon + (target_lon - clon) * lerp
-        nclat = clat + (target_lat - clat) * lerp
-        
-        aspect = 16/9
-        new_xlim = (nclon - nw/2, nclon + nw/2)
-        new_ylim = (nclat - (nw/aspect)/2, nclat + (nw/aspect)/2)
-        
+        new_xlim, new_ylim = camera.limits(i)
         ax.set_xlim(new_xlim)
         ax.set_ylim(new_ylim)
         
-        # Update map tiles every 10 frames or when view changes significantly
-        current_bounds = (round(new_xlim[0], 1), round(new_xlim[1], 1), 
-                          round(new_ylim[0], 1), round(new_ylim[1], 1))
-        
-        if i % 10 == 0 or last_bounds != current_bounds:
+        # Swap the map when the schedule moves to a new view
+        bounds = tuple(camera.map_bounds[i].tolist())
+        if bounds != shown_bounds and not math.isnan(bounds[0]):
             try:
-                img, extent = get_map_for_bounds(new_xlim[0], new_xlim[1], 
-                                                  new_ylim[0], new_ylim[1])
-                map_layer.set_data(img)
-                map_layer.set_extent(extent)
-                last_bounds = current_bounds
+                img, extent = get_map_for_bounds(*bounds)
+                if img is not last_img:  # Same tile set -> same cached image
+                    map_layer.set_data(img)
+                    map_layer.set_extent(extent)
+                    last_img = img
+                shown_bounds = bounds
             except Exception as e:
                 print(f"Map update error: {e}")
         
         return main_line, glow_line, dot, date_text, map_layer
 
+    return fig, update
+
+class PNGFrameWriter(animation.AbstractMovieWriter):
+    """Writes each frame as a numbered PNG in the output directory, so GIF
+    chunks can be joined and encoded once, exactly like PillowWriter."""
+
+    def _supports_transparency(self):
+        return True
+
+    def setup(self, fig, outfile, dpi=None):
+        super().setup(fig, outfile, dpi=dpi)
+        os.makedirs(outfile, exist_ok=True)
+        self._count = 0
+
+    def grab_frame(self, **savefig_kwargs):
+        buf = BytesIO()
+        self.fig.savefig(buf, **{**savefig_kwargs, "format": "rgba", "dpi": self.dpi})
+        img = Image.frombuffer("RGBA", self.frame_size, buf.getbuffer(), "raw", "RGBA", 0, 1)
+        if img.getextrema()[3][0] == 255:  # Opaque frames go to RGB, as in PillowWriter
+            img = img.convert("RGB")
+        img.save(os.path.join(self.outfile, f"{self._count:05d}.png"))
+        self._count += 1
+
+    def finish(self):
+        pass
+
+def make_writer(use_ffmpeg, fps):
+    if use_ffmpeg:
+        return animation.FFMpegWriter(fps=fps, metadata=dict(artist='TravelVisualizer'), bitrate=8000)
+    return PillowWriter(fps=fps)
+
+def render_chunk(lons, lats, times, camera, start, end, output, use_ffmpeg, fps, tile_url):
+    """Render frames [start, end) to output in a worker process."""
+    global TILE_URL
+    TILE_URL = tile_url
+    fig, update = build_scene(lons, lats, times, camera)
+    ani = animation.FuncAnimation(fig, update, frames=range(start, end), blit=False)
+    writer = make_writer(True, fps) if use_ffmpeg else PNGFrameWriter(fps=fps)
+    ani.save(output, writer=writer)
+    plt.close(fig)
+    return output
+
+def concat_segments(segments, output, use_ffmpeg, fps):
+    """Join rendered chunk files, in order, into one video or GIF."""
+    if use_ffmpeg:
+        list_file = Path(segments[0]).with_name("segments.txt")
+        list_file.write_text("".join(f"file '{Path(seg).resolve()}'\n" for seg in segments))
+        subprocess.run([matplotlib.rcParams["animation.ffmpeg_path"], "-y", "-loglevel", "error",
+                        "-f", "concat", "-safe", "0", "-i", str(list_file), "-c", "copy", output],
+                       check=True)
+        return
+
+    # GIF: segments are PNG frame directories; encode once, as PillowWriter does
+    frames = []
+    for seg in segments:
+        for name in sorted(os.listdir(seg)):
+            frame = Image.open(os.path.join(seg, name))
+            frame.load()
+            frames.append(frame)
+    frames[0].save(output, save_all=True, append_images=frames[1:],
+                   duration=int(1000 / fps), loop=0)
+
+def render_parallel(lons, lats, times, camera, output, fps, jobs):
+    """Split the frames into `jobs` chunks, render them in separate processes
+    and concatenate the segments. Falls back to GIF without ffmpeg."""
+    use_ffmpeg = animation.FFMpegWriter.isAvailable()
+    if not use_ffmpeg:
+        base, ext = os.path.splitext(output)
+        if ext.lower() != '.gif':
+            output = base + '.gif'
+        print(f"FFmpeg not found; rendering GIF chunks: {output}")
+    ext = ".mp4" if use_ffmpeg else ""
+
+    total_frames = len(lons)
+    bounds = np.linspace(0, total_frames, jobs + 1).astype(int)
+    with tempfile.TemporaryDirectory(prefix="timeline_chunks_") as tmp:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx) as pool:
+            futures = [pool.submit(render_chunk, lons, lats, times, camera, int(start), int(end),
+                                   os.path.join(tmp, f"chunk_{n:03d}{ext}"), use_ffmpeg, fps, TILE_URL)
+                       for n, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])) if end > start]
+            segments = [f.result() for f in futures]
+        print(f"Joining {len(segments)} chunks...")
+        concat_segments(segments, output, use_ffmpeg, fps)
+    return output
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input", default="new2025.json")
+    ap.add_argument("--output", default="trip_2025.mp4")
+    ap.add_argument("--fps", type=int, default=30)
+    ap.add_argument("--year", type=int, default=2025)
+    ap.add_argument("--duration", type=int, default=50)
+    ap.add_argument("--dark", action="store_true", help="Use dark map tiles")
+    ap.add_argument("--tile-url", help="Tile URL template with {z}/{x}/{y} (e.g. a local tile server)")
+    ap.add_argument("--jobs", type=int, default=1,
+                    help="Render frame chunks in this many processes and join them")
+    ap.add_argument("--regions", help="JSON file of camera regions (see REGIONS)")
+    args = ap.parse_args()
+
+    # Set tile URL based on theme
+    global TILE_URL
+    if args.dark:
+        TILE_URL = "https://a.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}.png"
+    if args.tile_url:
+        TILE_URL = args.tile_url
+
+    print("Loading data...")
+    with open(args.input, "r", encoding="utf-8") as f:
+        raw_pts = extract_raw_points(iter_segments(f), target_year=args.year)
+    if len(raw_pts) < 2:
+        print("Not enough points found.")
+        return
+
+    total_frames = args.fps * args.duration
+    lons, lats, times = prepare_animation_data(raw_pts, total_frames)
+
+    regions = load_regions(args.regions) if args.regions else REGIONS
+    camera = camera_path(lons, lats, regions)
+    prefetch_tiles(camera)
+
+    if args.jobs > 1:
+        print(f"Generating {total_frames} frames in {args.jobs} processes...")
+        output = render_parallel(lons, lats, times, camera, args.output, args.fps, args.jobs)
+        print(f"Saved to {output}")
+        return
+
+    print("Setting up plot...")
+    fig, update = build_scene(lons, lats, times, camera)
+
     print(f"Generating {total_frames} frames...")
     print("(First run will download tiles - subsequent runs use cache)")
     ani = animation.FuncAnimation(fig, update, frames=total_frames, blit=False)
     
     # Try using ffmpeg writer; fallback to PillowWriter if ffmpeg is unavailable
     try:
-        writer = animation.FFMpegWriter(fps=args.fps, metadata=dict(artist='TravelVisualizer'), bitrate=8000)
+        writer = make_writer(True, args.fps)
         ani.save(args.output, writer=writer)
         print(f"Movie saved to {args.output}")
     except (FileNotFoundError, RuntimeError, OSError) as e:
@@ -489,7 +855,7 @@ def main():
         if ext.lower() != '.gif':
             fallback_output = base + '.gif'
         print(f"FFmpeg not found or failed ({e}); falling back to GIF output: {fallback_output}")
-        writer = PillowWriter(fps=args.fps)
+        writer = make_writer(False, args.fps)
         ani.save(fallback_output, writer=writer)
         print(f"GIF saved to {fallback_output}")
 